@@ -1,6 +1,11 @@
 from collections import defaultdict
-from utils import remove_all, unique, first, Expr, subexpressions, extend
+from functools import partial, reduce
+from operator import itemgetter
+from logic_expr import Expr, subexpressions, intern_expr
 from parser_utils import *
+from cdcl import CDCLSolver, SymbolTable
+from budget import within_budget, BudgetExceeded
+import instrumentation
 
 class KB:
     """A knowledge base to which you can tell and ask sentences.
@@ -18,7 +23,7 @@ class KB:
 
     def ask(self, query):
         """Return a substitution that makes the query true, or, failing that, return False."""
-        return first(self.ask_generator(query), default=False)
+        return next(iter(self.ask_generator(query)), False)
 
     def ask_generator(self, query):
         """Yield all the substitutions that make query true."""
@@ -30,28 +35,299 @@ class KB:
 
 
 class PropKB(KB):
-    """A general KB for propositional logic."""
+    """A general KB for propositional logic.
+    engine selects the default solver behind ask_generator_dpll: 'dpll' for
+    the recursive DPLL below, 'cdcl' for the clause-learning solver in cdcl.py,
+    'portfolio' to race several of both in parallel processes (portfolio.py),
+    'cubes' to split the DPLL search into cubes solved in parallel (cubes.py).
+    cnf is the to_cnf method used by tell: 'distribute' or 'tseitin'.
+    With decompose=True, TT and the DPLL engines solve the query on the
+    components of the KB that share symbols with it (see decompose.py).
+    Next to the Expr clauses the KB keeps them compiled to signed ints in a
+    CompiledKB, which is what TT, DPLL and CDCL read."""
 
-    def __init__(self, sentence=None):
-        super().__init__(sentence)
+    def __init__(self, sentence=None, engine='dpll', cnf='distribute', decompose=False):
         self.clauses = []
+        self.compiled = CompiledKB()
+        self.engine = engine
+        self.cnf = cnf
+        self.decompose = decompose
+        self.told = defaultdict(list)
+        super().__init__(sentence)
 
     def tell(self, sentence):
         """Convert the sentence into CNF and add the sentence's clauses to the KB."""
-        self.clauses.extend(conjuncts(to_cnf(sentence)))
+        with instrumentation.phase('cnf'):
+            clauses = [intern_expr(c) for c in conjuncts(to_cnf(sentence, self.cnf))]
+        self.told[intern_expr(sentence)].append(clauses)
+        self.add_clauses(clauses)
 
-    def ask_generator_tt(self, query):
-        """Yield the empty substitution {} if KB entails query; else no results."""
-        return tt_entails(Expr('&', *self.clauses), query)
+    def add_clauses(self, clauses):
+        """Add clauses that are already in CNF."""
+        self.clauses.extend(clauses)
+        for c in clauses:
+            self.compiled.add(c)
+
+    def ask_generator_tt(self, query, vectorized=False, budget=None):
+        """Yield the empty substitution {} if KB entails query; else no results.
+        With vectorized=True the truth table is checked with bit-parallel NumPy code.
+        Every ask_generator_* method takes an optional budget.Budget and returns
+        (UNKNOWN, stats) if the budget runs out."""
+        if vectorized:
+            return within_budget(budget, tt_entails, Expr('&', *self.clauses), intern_expr(query), True)
+        if self.decompose:
+            from decompose import decomposed_tt_entails
+            return self._ask(budget, decomposed_tt_entails, intern_expr(query))
+        return self._ask(budget, tt_entails_compiled, intern_expr(query))
     
-    def ask_generator_dpll(self, query):
-        return dpll_entails(self.clauses, query)
+    def ask_generator_count(self, query, budget=None):
+        """Like ask_generator_tt, count of models included, but by model counting
+        with component caching (see counting.py) instead of enumeration."""
+        from counting import count_entails
+        return self._ask(budget, count_entails, intern_expr(query), self.cnf)
+
+    def models(self, query=None, budget=None):
+        """Yield the models of the KB, and of query if given, one at a time as
+        {symbol: value} dicts over the symbols of the KB and the query."""
+        from counting import models
+        n = len(self.compiled.table)
+        extra = self.compiled.encode_cnf(to_cnf(intern_expr(query), self.cnf)) if query is not None else []
+        variables = self.compiled.variables(extra)
+        decode = list(self.compiled.table.symbols)
+        self.compiled.table.truncate(n)
+        for model in models(self.compiled.clauses + extra, variables, budget):
+            yield hide_aux({decode[v]: value for v, value in model.items()})
+
+    def ask_generator_dpll(self, query, engine=None, budget=None, heuristic=None):
+        """engine is 'dpll', 'cdcl', 'portfolio' (see portfolio.py) or 'cubes'
+        (cube-and-conquer, see cubes.py); the default is self.engine.
+        heuristic names the branching heuristic for 'dpll' (see heuristics.py)."""
+        query = intern_expr(query)
+        engine = engine or self.engine
+        if engine == 'portfolio':
+            from portfolio import portfolio_entails as entails
+        elif engine == 'cubes':
+            from cubes import cube_entails as entails
+        elif engine == 'cdcl':
+            entails = cdcl_entails
+        else:
+            entails = partial(dpll_entails, heuristic=heuristic)
+        if self.decompose:
+            from decompose import decomposed_entails
+            entails = partial(decomposed_entails, entails=entails)
+        return self._ask(budget, entails, query, self.cnf)
+
+    def _ask(self, budget, entails, *args):
+        """within_budget(budget, entails, self.compiled, *args), then forget the
+        symbols the query added to the symbol table, such as its Tseitin symbols."""
+        n = len(self.compiled.table)
+        try:
+            return within_budget(budget, entails, self.compiled, *args)
+        finally:
+            self.compiled.table.truncate(n)
 
     def retract(self, sentence):
-        """Remove the sentence's clauses from the KB."""
-        for c in conjuncts(to_cnf(sentence)):
+        """Remove the clauses of the most recent tell of exactly this sentence.
+        A sentence that was not told (its clauses were added directly) has its
+        clauses matched instead; with cnf='tseitin' that raises ValueError,
+        since the auxiliary symbols of its clauses are not known."""
+        sentence = intern_expr(sentence)
+        if self.told.get(sentence):
+            clauses = self.told[sentence].pop()
+        else:
+            clauses = [intern_expr(c) for c in conjuncts(to_cnf(sentence, 'distribute'))]
+            if self.cnf == 'tseitin' and any(c not in self.clauses for c in clauses):
+                raise ValueError('cannot retract {}: it was not told to this KB'.format(sentence))
+        for c in clauses:
             if c in self.clauses:
                 self.clauses.remove(c)
+                self.compiled.remove(c)
+
+
+class CompiledKB:
+    """The clauses of a PropKB in the DIMACS style: a SymbolTable numbering the
+    symbols from 1, and every clause as a tuple of signed ints.
+    occurrences counts the clauses each variable appears in. The table also
+    numbers query symbols and symbols of retracted clauses, so variables()
+    gives the ones that currently matter.
+    Clause evaluators over array models are built on first use and then kept
+    up to date; they are not pickled."""
+
+    def __init__(self, clauses=()):
+        self.table = SymbolTable()
+        self.clauses = []
+        self.occurrences = defaultdict(int)
+        self._evaluators = None
+        for c in clauses:
+            self.add(c)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_evaluators'] = None
+        return state
+
+    def encode(self, clause):
+        """Return a CNF clause Expr as a tuple of distinct signed ints, or None if it is True."""
+        lits = self.table.clause(clause)
+        return None if lits is None else tuple(dict.fromkeys(lits))
+
+    def encode_cnf(self, sentence):
+        """Return the int clauses of a CNF sentence without adding them to the KB."""
+        return [lits for lits in map(self.encode, conjuncts(sentence)) if lits is not None]
+
+    def add(self, clause):
+        lits = self.encode(clause)
+        if lits is not None:
+            self.add_lits(lits)
+
+    def add_lits(self, lits):
+        """Add a clause given as a tuple of distinct signed ints whose variables
+        are already in the table."""
+        self.clauses.append(lits)
+        for lit in lits:
+            self.occurrences[abs(lit)] += 1
+        if self._evaluators is not None:
+            self._evaluators.append(clause_evaluator(lits))
+
+    def remove(self, clause):
+        lits = self.encode(clause)
+        if lits is None:
+            return
+        i = self.clauses.index(lits)
+        del self.clauses[i]
+        if self._evaluators is not None:
+            del self._evaluators[i]
+        for lit in lits:
+            v = abs(lit)
+            self.occurrences[v] -= 1
+            if not self.occurrences[v]:
+                del self.occurrences[v]
+
+    @property
+    def evaluators(self):
+        """One clause_evaluator per clause, in order."""
+        if self._evaluators is None:
+            self._evaluators = [clause_evaluator(lits) for lits in self.clauses]
+        return self._evaluators
+
+    def variables(self, extra=()):
+        """Return, sorted, the variables of the KB's clauses and of the extra int clauses."""
+        vs = set(self.occurrences)
+        for lits in extra:
+            vs.update(abs(lit) for lit in lits)
+        return sorted(vs)
+
+    def model_dict(self, model, variables):
+        """Turn an array model into a {symbol: value} dict of the assigned variables."""
+        symbols = self.table.symbols
+        return {symbols[v]: model[v] for v in variables if model[v] is not None}
+
+class IncrementalPropKB(PropKB):
+    """A PropKB that keeps one CDCL solver alive across queries.
+    Each told sentence gets a selector variable s and its clauses are stored as
+    (clause | ~s); a query assumes every active selector plus the negated query,
+    so learned clauses and variable activity carry over to the next query.
+    retract, like the end of a query with a compound negation, switches a
+    selector off for good instead of rebuilding. Once the clauses switched off
+    outnumber both rebuild_min and the active ones, the solver is rebuilt from
+    the active sentences, which drops them and their variables."""
+
+    rebuild_min = 64
+
+    def __init__(self, sentence=None, cnf='distribute'):
+        self.table = SymbolTable()
+        self.solver = CDCLSolver()
+        self.selectors = defaultdict(list)
+        self.active = {}
+        self.dead = 0
+        super().__init__(sentence, engine='cdcl', cnf=cnf)
+
+    def tell(self, sentence):
+        """Add the sentence's clauses to the KB and to the solver, guarded by a new selector."""
+        sentence = intern_expr(sentence)
+        with instrumentation.phase('cnf'):
+            clauses = [intern_expr(c) for c in conjuncts(to_cnf(sentence, self.cnf))]
+        self.clauses.extend(clauses)
+        for c in clauses:
+            self.compiled.add(c)
+        selector = self.table.fresh()
+        self.selectors[sentence].append(selector)
+        self.active[selector] = clauses
+        self._add_guarded(clauses, selector)
+
+    def retract(self, sentence):
+        """Remove the clauses of the most recent tell of exactly this sentence."""
+        sentence = intern_expr(sentence)
+        if not self.selectors.get(sentence):
+            return
+        selector = self.selectors[sentence].pop()
+        clauses = self.active.pop(selector)
+        for c in clauses:
+            self.clauses.remove(c)
+            self.compiled.remove(c)
+        self._switch_off(selector, len(clauses))
+
+    def ask_generator_dpll(self, query, engine=None, budget=None):
+        """Solve under assumptions: the active selectors and the negated query."""
+        return within_budget(budget, self._solve_query, intern_expr(query))
+
+    def _add_guarded(self, clauses, selector):
+        for c in clauses:
+            lits = self.table.clause(c)
+            if lits is not None:
+                self.solver.add_clause(lits + [-selector])
+
+    def _switch_off(self, selector, n):
+        """Disable the n clauses guarded by selector for good."""
+        self.solver.add_clause([-selector])
+        self.dead += n
+        if self.dead > max(self.rebuild_min, len(self.clauses)):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Replace the solver with a new one holding only the active sentences."""
+        active = self.active
+        self.table = SymbolTable()
+        self.solver = CDCLSolver()
+        self.active = {}
+        self.dead = 0
+        for sentence in list(self.selectors):
+            if not self.selectors[sentence]:
+                del self.selectors[sentence]
+                continue
+            selectors = []
+            for old in self.selectors[sentence]:
+                selector = self.table.fresh()
+                self.active[selector] = active[old]
+                self._add_guarded(active[old], selector)
+                selectors.append(selector)
+            self.selectors[sentence] = selectors
+
+    def _solve_query(self, query, budget=None):
+        assumptions = list(self.active)
+        negated = to_cnf(~query, self.cnf)
+        retire = None
+        if is_prop_symbol(negated.op) or (negated.op == '~' and is_prop_symbol(negated.args[0].op)):
+            assumptions.append(self.table.literal(negated))
+        else:
+            retire = self.table.fresh()
+            negated = conjuncts(negated)
+            self._add_guarded(negated, retire)
+            assumptions.append(retire)
+        self.solver.budget = budget
+        before = dict(self.solver.stats)
+        try:
+            satisfiable = self.solver.solve(assumptions)
+        finally:
+            self.solver.budget = None
+            record_solver_stats(self.solver, before)
+            model, table = self.solver.model, self.table
+            if retire is not None:
+                self._switch_off(retire, len(negated))
+        if not satisfiable:
+            return True, None
+        return False, hide_aux({table.symbol(v): val for v, val in model.items()
+                                if table.symbol(v) is not None})
 
 # ______________________________________________________________________________
 
@@ -109,7 +385,7 @@ def is_definite_clause(s):
 
 # ______________________________________________________________________________
 
-def tt_entails(kb, alpha):
+def tt_entails(kb, alpha, vectorized=False, budget=None):
     """
     Does kb entail the sentence alpha? Use truth tables. For propositional
     kb's and sentences. Note that the 'kb' should be an Expr which is a
@@ -117,6 +393,8 @@ def tt_entails(kb, alpha):
     >>> tt_entails(expr('P & Q'), expr('Q'))
     True
     """
+    if vectorized:
+        return tt_entails_bitwise(kb, alpha, budget=budget)
     number_of_kb_models = 0
     def increase_counter():
         nonlocal number_of_kb_models
@@ -124,14 +402,38 @@ def tt_entails(kb, alpha):
 
     assert not variables(alpha)
     symbols = list(prop_symbols(kb & alpha))
-    return (tt_check_all(kb, alpha, symbols, {}, increase_counter), number_of_kb_models)
+    index = {s: i for i, s in enumerate(symbols, 1)}
+    return (tt_check_all(compile_pl(kb, index), compile_pl(alpha, index), list(index.values()),
+                         [None] * (len(symbols) + 1), increase_counter, budget), number_of_kb_models)
 
 
-def tt_check_all(kb, alpha, symbols, model, increment):
-    """Auxiliary routine to implement tt_entails."""
-    if not symbols:
-        if pl_true(kb, model):
-            result = pl_true(alpha, model)
+def tt_entails_compiled(kb, alpha, budget=None):
+    """tt_entails for a CompiledKB kb: the models are arrays indexed by variable."""
+    assert not variables(alpha)
+    table = kb.table
+    query_vars = [table.var(s) for s in prop_symbols(alpha)]
+    number_of_kb_models = 0
+    def increase_counter():
+        nonlocal number_of_kb_models
+        number_of_kb_models += 1
+
+    return (tt_check_all(conjunction_evaluator(kb.evaluators), compile_pl(alpha, table.index),
+                         kb.variables([query_vars]), [None] * (len(table) + 1), increase_counter, budget),
+            number_of_kb_models)
+
+
+def tt_check_all(kb, alpha, symbols, model, increment, budget=None, depth=0):
+    """Auxiliary routine to implement tt_entails. kb and alpha are compiled with
+    compile_pl, symbols are positions in the array model. The model is assigned
+    in place: symbols[:depth] are set and are restored before returning."""
+    if depth == len(symbols):
+        if budget is not None:
+            budget.model()
+        stats = instrumentation.current
+        if stats is not None:
+            stats.models += 1
+        if kb(model):
+            result = alpha(model)
             assert result in (True, False)
             if result:
                 increment()
@@ -139,9 +441,152 @@ def tt_check_all(kb, alpha, symbols, model, increment):
         else:
             return True
     else:
-        P, rest = symbols[0], symbols[1:]
-        return (tt_check_all(kb, alpha, rest, extend(model, P, True), increment) and
-                tt_check_all(kb, alpha, rest, extend(model, P, False), increment))
+        P = symbols[depth]
+        model[P] = True
+        result = tt_check_all(kb, alpha, symbols, model, increment, budget, depth + 1)
+        if result:
+            model[P] = False
+            result = tt_check_all(kb, alpha, symbols, model, increment, budget, depth + 1)
+        model[P] = None
+        return result
+
+
+# Truth values of the first six symbols across the 64 models packed in one word.
+_WORD_PATTERNS = (0xAAAAAAAAAAAAAAAA, 0xCCCCCCCCCCCCCCCC, 0xF0F0F0F0F0F0F0F0,
+                  0xFF00FF00FF00FF00, 0xFFFF0000FFFF0000, 0xFFFFFFFF00000000)
+_TT_BLOCK_WORDS = 1 << 14
+
+
+def compile_bitwise(exprs, symbols):
+    """Compile the propositional Exprs into a straight-line program.
+    Registers 0..len(symbols)-1 hold the symbols; every instruction (op, args)
+    appends one register. A conjunction or disjunction of several arguments
+    becomes a chain of two-argument steps, each taken as soon as its argument
+    is computed, so that the arguments need not all be held at once.
+    Returns the program and the register of each Expr."""
+    registers = {s: i for i, s in enumerate(symbols)}
+    program = []
+
+    def append(instruction):
+        program.append(instruction)
+        return len(symbols) + len(program) - 1
+
+    def emit(x):
+        if x in (True, False):
+            key = ('const', bool(x))
+            if key not in registers:
+                registers[key] = append(key)
+            return registers[key]
+        if x in registers:
+            return registers[x]
+        if is_prop_symbol(x.op) or x.op not in ('~', '&', '|', '==>', '<=>', '^'):
+            raise ValueError('Illegal operator in logic expression' + str(x))
+        if x.op in ('&', '|') and len(x.args) > 2:
+            register = emit(x.args[0])
+            for arg in x.args[1:]:
+                register = append((x.op, (register, emit(arg))))
+        else:
+            register = append((x.op, tuple(emit(arg) for arg in x.args)))
+        registers[x] = register
+        return register
+
+    return program, [emit(x) for x in exprs]
+
+
+def run_bitwise(program, registers, words, keep=None):
+    """Execute a program from compile_bitwise over NumPy uint64 registers
+    shaped like the array words. If keep is given, every other register is
+    released (set to None) after its last use, so memory grows with the
+    registers live at once rather than with the length of the program."""
+    import numpy as np
+    ones = ~np.zeros_like(words)
+    release = [[] for _ in program]
+    if keep is not None:
+        last_use = {}
+        for i, (op, args) in enumerate(program):
+            if op != 'const':
+                for a in args:
+                    last_use[a] = i
+        for a, i in last_use.items():
+            if a not in keep:
+                release[i].append(a)
+    for (op, args), done in zip(program, release):
+        if op == 'const':
+            registers.append(ones if args else ~ones)
+        elif op == '~':
+            registers.append(~registers[args[0]])
+        elif op == '&':
+            registers.append(reduce(np.bitwise_and, (registers[a] for a in args), ones))
+        elif op == '|':
+            registers.append(reduce(np.bitwise_or, (registers[a] for a in args), ~ones))
+        elif op == '==>':
+            registers.append(~registers[args[0]] | registers[args[1]])
+        elif op == '<=>':
+            registers.append(~(registers[args[0]] ^ registers[args[1]]))
+        else:
+            registers.append(registers[args[0]] ^ registers[args[1]])
+        for a in done:
+            registers[a] = None
+    return registers
+
+
+def popcount(words):
+    """Number of set bits in an array of uint64 words."""
+    import numpy as np
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def tt_entails_bitwise(kb, alpha, block_words=_TT_BLOCK_WORDS, budget=None):
+    """
+    Truth-table entailment evaluated 64 models at a time. The models are
+    numbered in the order tt_check_all visits them: in model m, the k-th of n
+    symbols is true when bit n-1-k of m is 0. They are packed into uint64 words,
+    model m at bit m % 64 of word m // 64, and checked in blocks of block_words
+    words. Returns the same pair as tt_entails, count included.
+    >>> tt_entails_bitwise(expr('A | B'), expr('A'))
+    (False, 2)
+    """
+    import numpy as np
+    assert not variables(alpha)
+    symbols = list(prop_symbols(kb & alpha))
+    n = len(symbols)
+    program, (kb_reg, alpha_reg) = compile_bitwise([kb, alpha], symbols)
+    total_words = 1 << max(n - 6, 0)
+    valid = np.uint64((1 << (1 << n)) - 1) if n < 6 else ~np.uint64(0)
+    number_of_kb_models = 0
+    for start in range(0, total_words, block_words):
+        words = np.arange(start, min(start + block_words, total_words), dtype=np.uint64)
+        registers = []
+        for k in range(n):
+            bit = n - 1 - k
+            if bit < 6:
+                registers.append(np.full_like(words, ~_WORD_PATTERNS[bit] & 0xFFFFFFFFFFFFFFFF))
+            else:
+                registers.append(((words >> np.uint64(bit - 6)) & np.uint64(1)) - np.uint64(1))
+        registers = run_bitwise(program, registers, words, (kb_reg, alpha_reg))
+        kb_true = registers[kb_reg] & valid
+        models = kb_true & registers[alpha_reg]
+        counterexamples = kb_true & ~registers[alpha_reg]
+        if counterexamples.any():
+            w = int(np.flatnonzero(counterexamples)[0])
+            bad = int(counterexamples[w])
+            first = (bad & -bad).bit_length() - 1
+            checked = (start + w) * 64 + first + 1
+            _count_tt_models(budget, checked - start * 64)
+            before = int(models[w]) & ((1 << first) - 1)
+            return False, number_of_kb_models + popcount(models[:w]) + bin(before).count('1')
+        _count_tt_models(budget, min(len(words) * 64, 1 << n))
+        number_of_kb_models += popcount(models)
+    return True, number_of_kb_models
+
+
+def _count_tt_models(budget, n):
+    if budget is not None:
+        budget.model(n)
+    if instrumentation.current is not None:
+        instrumentation.current.models += n
 
 
 def prop_symbols(x):
@@ -193,7 +638,15 @@ def pl_true(exp, model={}):
         return result
     p, q = args
     if op == '==>':
-        return pl_true(~p | q, model)
+        pt = pl_true(p, model)
+        if pt is False:
+            return True
+        qt = pl_true(q, model)
+        if qt is True:
+            return True
+        if pt is None or qt is None:
+            return None
+        return False
 
     pt = pl_true(p, model)
     if pt is None:
@@ -206,143 +659,649 @@ def pl_true(exp, model={}):
     else:
         raise ValueError('Illegal operator in logic expression' + str(exp))
 
+def is_literal(x):
+    """Is x a propositional symbol or the negation of one?"""
+    return is_prop_symbol(x.op) or (x.op == '~' and is_prop_symbol(x.args[0].op))
+
+
+def compile_pl(exp, index):
+    """Compile a propositional Expr into a function of an array model.
+    index maps every symbol to its position in the model list, counting from 1
+    as for a SymbolTable; the entries are True, False or None (unassigned).
+    The function returns what pl_true returns for the same assignment, without
+    walking the Expr or comparing op strings.
+    >>> compile_pl(expr('P | ~Q'), {P: 1, Q: 2})([None, False, None]) is None
+    True
+    """
+    if exp in (True, False):
+        return lambda model: exp
+    op, args = exp.op, exp.args
+    if is_prop_symbol(op):
+        return itemgetter(index[exp])
+    if op == '|' and all(is_literal(arg) for arg in args):
+        return clause_evaluator([-index[arg.args[0]] if arg.op == '~' else index[arg] for arg in args])
+    fs = tuple(compile_pl(arg, index) for arg in args)
+    if op == '~':
+        f = fs[0]
+
+        def negation(model):
+            v = f(model)
+            return None if v is None else not v
+        return negation
+    if op == '|':
+        def disjunction(model):
+            result = False
+            for f in fs:
+                v = f(model)
+                if v is True:
+                    return True
+                if v is None:
+                    result = None
+            return result
+        return disjunction
+    if op == '&':
+        return conjunction_evaluator(fs)
+    if op not in ('==>', '<=>'):
+        raise ValueError('Illegal operator in logic expression' + str(exp))
+    f, g = fs
+    if op == '==>':
+        def implication(model):
+            pt = f(model)
+            if pt is False:
+                return True
+            qt = g(model)
+            if qt is True:
+                return True
+            if pt is None or qt is None:
+                return None
+            return False
+        return implication
+
+    def biconditional(model):
+        pt = f(model)
+        if pt is None:
+            return None
+        qt = g(model)
+        if qt is None:
+            return None
+        return pt == qt
+    return biconditional
+
+def clause_evaluator(lits):
+    """Return the three-valued evaluator of a clause of signed ints over an array
+    model indexed by variable. Positions must be non-zero: the model is indexed
+    by abs(lit), as for a CompiledKB."""
+    pos = tuple(lit for lit in lits if lit > 0)
+    neg = tuple(-lit for lit in lits if lit < 0)
+
+    def clause(model):
+        result = False
+        for i in pos:
+            v = model[i]
+            if v:
+                return True
+            if v is None:
+                result = None
+        for i in neg:
+            v = model[i]
+            if v is False:
+                return True
+            if v is None:
+                result = None
+        return result
+    return clause
+
+
+def conjunction_evaluator(fs):
+    """Return the three-valued conjunction of the evaluators fs."""
+    def conjunction(model):
+        result = True
+        for f in fs:
+            v = f(model)
+            if v is False:
+                return False
+            if v is None:
+                result = None
+        return result
+    return conjunction
+
 # ______________________________________________________________________________
 
 class PropDefiniteKB(PropKB):
-    """A Horn KB for propositional definite clauses."""
+    """A Horn KB for propositional definite clauses.
+    The KB keeps indexes from each symbol to the rules that have it as a premise
+    or as the conclusion, plus the number of distinct premises of every rule.
+    tell and retract update them in time proportional to the clause size.
+    With materialize=True the KB also keeps the forward-chaining closure: tell
+    propagates only what the new clause adds, retract drops the closure to be
+    rebuilt by the next query, and an FC query outside the closure is answered
+    NO by a membership test; one inside is still chained to, so that it reports
+    the same inferred symbols as without materialize.
+    Backward chaining tables its results across queries: proofs maps each proven
+    symbol to the clause that proved it and failures holds symbols with no proof.
+    tell forgets the failures that the new clause may now prove, retract the
+    proofs that rested on the removed clause."""
+
+    def __init__(self, sentence=None, materialize=False):
+        self.facts = {}
+        self.premises = {}
+        self.premise_count = {}
+        self.premise_index = defaultdict(dict)
+        self.conclusion_index = defaultdict(dict)
+        self.multiplicity = defaultdict(int)
+        self.materialize = materialize
+        self.closure = None
+        self.remaining = None
+        self.proofs = {}
+        self.failures = set()
+        super().__init__(sentence)
 
     def tell(self, sentence):
         """Add a definite clause to this Horn KB."""
         assert is_definite_clause(sentence), "Must be definite clause"
+        sentence = intern_expr(sentence)
         self.clauses.append(sentence)
+        self.multiplicity[sentence] += 1
+        if self.multiplicity[sentence] == 1:
+            self._index(sentence)
+            if self.closure is not None:
+                self._add_to_closure(sentence)
+            if self.failures:
+                self.failures.difference_update(self._dependents(conclusion(sentence)))
 
-    def ask_generator_fc(self, query):
+    def ask_generator_fc(self, query, budget=None):
         """"Forward chaining method"""
-        return pl_fc_entails(self, query)
+        if self.materialize:
+            return within_budget(budget, self._ask_closure, intern_expr(query))
+        return within_budget(budget, pl_fc_entails, self, intern_expr(query))
+
+    def entailed(self, query, budget=None):
+        """Is the symbol query entailed? Materialises the closure if it is not current."""
+        if self.closure is None:
+            self.materialize_closure(budget)
+        return query in self.closure
+
+    def materialize_closure(self, budget=None):
+        """Run forward chaining to a fixpoint and keep every entailed symbol."""
+        self.closure = set()
+        self.remaining = dict(self.premise_count)
+        self._propagate(list(self.facts), budget)
+        return self.closure
+
+    def _ask_closure(self, query, budget=None):
+        if self.entailed(query, budget):
+            return pl_fc_entails(self, query, budget)
+        return False, None
+
+    def _add_to_closure(self, c):
+        """Semi-naive update: propagate only the consequences of the new clause c."""
+        if c.op != '==>':
+            self._propagate([c])
+            return
+        self.remaining[c] = sum(p not in self.closure for p in self.premises[c])
+        if self.remaining[c] == 0:
+            self._propagate([c.args[1]])
+
+    def _propagate(self, agenda, budget=None):
+        stats = instrumentation.current
+        closure, remaining = self.closure, self.remaining
+        try:
+            while agenda:
+                p = agenda.pop()
+                if budget is not None:
+                    budget.decision()
+                if stats is not None:
+                    stats.agenda_pops += 1
+                if p in closure:
+                    continue
+                closure.add(p)
+                if budget is not None:
+                    budget.learn()
+                if stats is not None:
+                    stats.index_lookups += 1
+                for c in self.premise_index.get(p, ()):
+                    remaining[c] -= 1
+                    if remaining[c] == 0:
+                        agenda.append(c.args[1])
+        except BudgetExceeded:
+            self.closure = self.remaining = None
+            raise
     
-    def ask_generator_bc(self, query):
-        """"Backward chaining method"""
-        return pl_bc_entails(self, query)
+    def ask_generator_bc(self, query, budget=None, proof=False):
+        """"Backward chaining method. With proof=True a YES comes with the proof tree
+        of the query instead of the set of symbols used in it."""
+        query = intern_expr(query)
+        result = within_budget(budget, pl_bc_entails, self, query)
+        if proof and result[0] is True:
+            return True, self.proof_tree(query)
+        return result
+
+    def proof_tree(self, symbol):
+        """Return the proof of a proven symbol as nested (symbol, (subproofs...)) pairs.
+        A premise used by several rules shares one subtree."""
+        trees = {}
+        stack = [symbol]
+        while stack:
+            s = stack[-1]
+            if s in trees:
+                stack.pop()
+                continue
+            c = self.proofs[s]
+            pending = [p for p in self.premises.get(c, ()) if p not in trees]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            trees[s] = (s, tuple(trees[p] for p in self.premises.get(c, ())))
+        return trees[symbol]
+
+    def proof_symbols(self, symbol):
+        """Return the set of symbols in the proof of a proven symbol."""
+        seen = {symbol}
+        stack = [symbol]
+        while stack:
+            for p in self.premises.get(self.proofs[stack.pop()], ()):
+                if p not in seen:
+                    seen.add(p)
+                    stack.append(p)
+        return seen
+
+    def _dependents(self, symbol):
+        """Return symbol and every conclusion reachable from it through rule premises."""
+        seen = {symbol}
+        stack = [symbol]
+        while stack:
+            for c in self.premise_index.get(stack.pop(), ()):
+                h = c.args[1]
+                if h not in seen:
+                    seen.add(h)
+                    stack.append(h)
+        return seen
+
+    def _forget_proofs(self, c):
+        """Drop the proof that used clause c and every proof built on top of it."""
+        stack = [conclusion(c)]
+        if self.proofs.get(stack[0]) != c:
+            return
+        del self.proofs[stack[0]]
+        while stack:
+            for r in self.premise_index.get(stack.pop(), ()):
+                h = r.args[1]
+                if h in self.proofs and self.proofs[h] == r:
+                    del self.proofs[h]
+                    stack.append(h)
 
     def retract(self, sentence):
+        sentence = intern_expr(sentence)
         self.clauses.remove(sentence)
+        self.multiplicity[sentence] -= 1
+        if self.multiplicity[sentence] == 0:
+            del self.multiplicity[sentence]
+            self._unindex(sentence)
+            self.closure = self.remaining = None
+            self._forget_proofs(sentence)
+
+    def _index(self, c):
+        if c.op != '==>':
+            self.facts[c] = None
+            return
+        premises = tuple(dict.fromkeys(conjuncts(c.args[0])))
+        self.premises[c] = premises
+        self.premise_count[c] = len(premises)
+        for p in premises:
+            self.premise_index[p][c] = None
+        self.conclusion_index[c.args[1]][c] = None
+
+    def _unindex(self, c):
+        if c.op != '==>':
+            del self.facts[c]
+            return
+        for p in self.premises.pop(c):
+            del self.premise_index[p][c]
+        del self.premise_count[c]
+        del self.conclusion_index[c.args[1]][c]
 
     def clauses_with_premise(self, p):
         """Return a list of the clauses in KB that have p in their premise."""
-        return [c for c in self.clauses if c.op == '==>' and p in conjuncts(c.args[0])]
+        return list(self.premise_index.get(p, ()))
     
     def clauses_with_conclusion(self, con):
         "Return a list of the clauses in KB that have con as the conclusion."
-        return [c for c in self.clauses if c.op == '==>' and con == c.args[1]]
+        return list(self.conclusion_index.get(con, ()))
     
 
-def pl_fc_entails(kb, q: Expr) -> tuple[bool, set]:
+def pl_fc_entails(kb, q: Expr, budget=None) -> tuple[bool, set]:
     """
     Use forward chaining to checks if a Horn KB entails symbol q.
+    Runs in time linear in the size of the KB.
     """
-    count = {c: len(conjuncts(c.args[0])) for c in kb.clauses if c.op == '==>'}
-    inferred = defaultdict(bool)
-    agenda = [s for s in kb.clauses if is_prop_symbol(s.op)]
+    stats = instrumentation.current
+    count = dict(kb.premise_count)
+    inferred = set()
+    agenda = list(kb.facts)
+    if q in kb.facts:
+        return True, set(agenda)
     while agenda:
-        # improve the performance by checking if the query is in the agenda
-        if q in agenda:
-            return True, set(agenda + list(inferred.keys()))
         p = agenda.pop()
-        if not inferred[p]:
-            inferred[p] = True
+        if budget is not None:
+            budget.decision()
+        if stats is not None:
+            stats.agenda_pops += 1
+        if p not in inferred:
+            inferred.add(p)
+            if budget is not None:
+                budget.learn()
+            if stats is not None:
+                stats.index_lookups += 1
             for c in kb.clauses_with_premise(p):
                 count[c] -= 1
                 if count[c] == 0:
                     agenda.append(c.args[1])
                     #improve the performance by checking if the query is in the conclusion of the clause
                     if c.args[1] == q:
-                        return True, set(agenda + list(inferred.keys()))
+                        return True, set(agenda) | inferred
     return False, None
 
-def pl_bc_entails(kb, q):
+def conclusion(c):
+    """The symbol a definite clause concludes: the fact itself or the rule's head."""
+    return c.args[1] if c.op == '==>' else c
+
+def pl_bc_entails(kb, q, budget=None):
     """
     Use backward chaining to checks if a Horn KB entails symbol q.
+    The search keeps an explicit stack of goals, so rule chains of any depth are
+    fine, and records its results in kb.proofs and kb.failures for later queries.
+    A goal that failed only because it needed a goal still in progress is not
+    recorded as failed, since that goal may yet be proven by another rule.
+    Returns (entailed, symbols used in the proof).
     """
-    inferred = {s for s in kb.clauses if is_prop_symbol(s.op)}
-    failed = set()
-    entailments = {q} # Used to keep track of all symbols that have been entailed during the search
+    stats = instrumentation.current
+    proofs, failures, facts = kb.proofs, kb.failures, kb.facts
 
-    def backward_chaining_check(symbol, goal):
-        nonlocal inferred, failed, entailments
-        if symbol in inferred:
+    def proven(symbol):
+        if symbol in proofs:
+            return True
+        if symbol in facts:
+            proofs[symbol] = symbol
             return True
-        if (symbol in failed) or (symbol in goal):
-            return False
-        
-        goal.append(symbol)
-        for c in kb.clauses_with_conclusion(symbol):
-            result = True
-            sub_goals = []
-            for p in conjuncts(c.args[0]):
-                sub_goals.append(p)
-                result = result and backward_chaining_check(p, goal)
-                if not result:
-                    break
-            if result == True:
-                entailments.update(sub_goals)
-                inferred.add(symbol)
-                goal.remove(symbol)
-                return True
-        failed.add(symbol)
-        goal.remove(symbol)
         return False
-    
-    return (backward_chaining_check(q, []), entailments)
 
-def dpll_entails(KB, q) -> tuple[bool, dict]: 
+    if not proven(q):
+        if q in failures:
+            return False, {q}
+        # frame: [goal, rules, rule position, premise position, shallowest in-progress goal it needed]
+        depth = {q: 0}
+        stack = [[q, kb.clauses_with_conclusion(q), 0, 0, 1]]
+        if stats is not None:
+            stats.goals += 1
+            stats.index_lookups += 1
+        if budget is not None:
+            budget.decision()
+        while stack:
+            frame = stack[-1]
+            goal, rules, i, j, low = frame
+            if i == len(rules):
+                stack.pop()
+                del depth[goal]
+                if low >= len(stack):
+                    failures.add(goal)
+                if not stack:
+                    return False, {q}
+                parent = stack[-1]
+                parent[2] += 1
+                parent[3] = 0
+                parent[4] = min(parent[4], low)
+                continue
+            premises = kb.premises[rules[i]]
+            if j == len(premises):
+                proofs[goal] = rules[i]
+                if budget is not None:
+                    budget.learn()
+                stack.pop()
+                del depth[goal]
+                if stack:
+                    stack[-1][3] += 1
+                continue
+            p = premises[j]
+            if proven(p):
+                frame[3] += 1
+            elif p in failures or p in depth:
+                if p in depth:
+                    frame[4] = min(low, depth[p])
+                frame[2] += 1
+                frame[3] = 0
+            else:
+                if budget is not None:
+                    budget.decision()
+                if stats is not None:
+                    stats.goals += 1
+                    stats.index_lookups += 1
+                depth[p] = len(stack)
+                stack.append([p, kb.clauses_with_conclusion(p), 0, 0, len(stack) + 1])
+    return True, kb.proof_symbols(q)
+
+def record_solver_stats(solver, before=None):
+    """Add a CDCLSolver's counters (minus those in before) to the current InferenceStats."""
+    stats = instrumentation.current
+    if stats is None:
+        return
+    before = before or {}
+    for key, name in (('decisions', 'decisions'), ('propagations', 'propagations'),
+                      ('conflicts', 'conflicts'), ('restarts', 'restarts'), ('learnts', 'learned_clauses')):
+        setattr(stats, name, getattr(stats, name) + solver.stats[key] - before.get(key, 0))
+
+def hide_aux(model):
+    """Drop the auxiliary Tseitin symbols from a model."""
+    if model is None:
+        return None
+    return {s: v for s, v in model.items() if not is_aux_symbol(s)}
+
+def dpll_entails(KB, q, cnf='distribute', budget=None, cubes=0, heuristic=None) -> tuple[bool, dict]: 
     """
     Use DPLL to checks if a Horn KB entails symbol q.
+    KB is a CompiledKB or a list of CNF clauses.
+    With cubes > 0 the search is split into cubes of that many decisions,
+    solved in parallel processes (see cubes.py). heuristic names a branching
+    heuristic from heuristics.py; by default DPLL branches in variable order.
     """
-    sentence = to_cnf(Expr('&', *KB) & ~expr(q))
-    symbols = list(prop_symbols(sentence))
-    satisfy, model = DPLL(sentence, symbols, {})
-    return not satisfy, model
-    
-def DPLL(sentence, symbols, model) -> tuple[bool, dict|None]:
-    #Checking the truth value of the sentence for a given model (can be partial or complete)
-    if pl_true(sentence, model) == False:
-        return False, None
-    
-    if pl_true(sentence, model) == True:
-        return True, model
-    
-    p, value = find_pure_symbol(sentence, symbols, model)
-    if p:
-        return DPLL(sentence, [s for s in symbols if s != p], extend(model, p, value))
-    p, value = find_unit_clause(sentence, symbols, model)
-    if p:
-        return DPLL(sentence, [s for s in symbols if s != p], extend(model, p, value))
-    
-    p = symbols[0]
-    
-    branch1 = DPLL(sentence, [s for s in symbols if s != p], extend(model, p, True))
-    if branch1[0]:
-        return True, branch1[1]
-    branch2 = DPLL(sentence, [s for s in symbols if s != p], extend(model, p, False))
-    if branch2[0]:
-        return True, branch2[1]
+    if cubes:
+        from cubes import cube_entails
+        return cube_entails(KB, q, cnf, budget, cubes)
+    KB = KB if isinstance(KB, CompiledKB) else CompiledKB(KB)
+    with instrumentation.phase('cnf'):
+        negated = KB.encode_cnf(to_cnf(~expr(q), cnf))
+    compiled = CompiledCNF(KB, negated)
+    trail = dpll_trail(compiled, len(KB.table) + 1, heuristic)
+    satisfy = DPLL(compiled, trail, budget)
+    return not satisfy, hide_aux(KB.model_dict(trail.values, compiled.variables) if satisfy else None)
     
+def dpll_satisfiable(KB, budget=None, heuristic=None) -> tuple[bool, dict]:
+    """Is the CompiledKB KB satisfiable? Returns (satisfiable, model) using DPLL,
+    branching with the named heuristic, if any."""
+    compiled = CompiledCNF(KB)
+    trail = dpll_trail(compiled, len(KB.table) + 1, heuristic)
+    if DPLL(compiled, trail, budget):
+        return True, KB.model_dict(trail.values, compiled.variables)
     return False, None
+
+def cdcl_satisfiable(KB, budget=None) -> tuple[bool, dict]:
+    """Is the CompiledKB KB satisfiable? Returns (satisfiable, model) using CDCL."""
+    solver = CDCLSolver(budget=budget)
+    for lits in KB.clauses:
+        solver.add_clause(lits)
+    try:
+        satisfiable = solver.solve()
+    finally:
+        record_solver_stats(solver)
+    if not satisfiable:
+        return False, None
+    return True, solver_model(KB, solver.model, KB.variables())
+
+def solver_model(KB, model, variables):
+    """Turn a solver's {variable: value} model of KB's clauses into a
+    {symbol: value} dict of variables."""
+    symbols = KB.table.symbols
+    return {symbols[v]: model[v] for v in variables if model.get(v) is not None}
+
+def cdcl_entails(KB, q, cnf='distribute', budget=None) -> tuple[bool, dict]:
+    """
+    Use the CDCL solver to check if a KB of CNF clauses entails q.
+    KB is a CompiledKB or a list of CNF clauses.
+    Returns the same (entailed, model) pair as dpll_entails.
+    """
+    KB = KB if isinstance(KB, CompiledKB) else CompiledKB(KB)
+    solver = CDCLSolver(budget=budget)
+    with instrumentation.phase('cnf'):
+        negated = KB.encode_cnf(to_cnf(~expr(q), cnf))
+    for lits in KB.clauses + negated:
+        solver.add_clause(lits)
+    try:
+        satisfiable = solver.solve()
+    finally:
+        record_solver_stats(solver)
+    if satisfiable:
+        return False, hide_aux(solver_model(KB, solver.model, KB.variables(negated)))
+    return True, None
+
+class CompiledCNF:
+    """The int clauses of a CompiledKB plus those of a negated query, prepared
+    for DPLL: the variables that occur in them, in branching order, an evaluator
+    for each clause and one for the whole sentence. polarity is the value DPLL
+    tries first. A heuristic from heuristics.py, if set, picks the branches
+    instead; it needs a HeuristicTrail. Models are arrays indexed by variable."""
+
+    def __init__(self, kb, extra=()):
+        self.polarity = True
+        self.heuristic = None
+        self.variables = kb.variables(extra)
+        self.clauses = kb.clauses + list(extra)
+        self.clause_evaluators = kb.evaluators + [clause_evaluator(lits) for lits in extra]
+        self.evaluate = conjunction_evaluator(self.clause_evaluators)
+
+
+class Trail:
+    """An array model plus the positions assigned so far, in order, so that a
+    search can backtrack by undoing back to a mark instead of copying models."""
+
+    __slots__ = ('values', 'assigned')
+
+    def __init__(self, n):
+        self.values = [None] * n
+        self.assigned = []
+
+    def assign(self, i, value):
+        self.values[i] = value
+        self.assigned.append(i)
+
+    def mark(self):
+        return len(self.assigned)
+
+    def undo(self, mark):
+        """Unassign everything assigned since mark was taken."""
+        values, assigned = self.values, self.assigned
+        while len(assigned) > mark:
+            values[assigned.pop()] = None
+
+
+class HeuristicTrail(Trail):
+    """A Trail that tells a branching heuristic about each assignment and
+    unassignment before the model changes."""
+
+    __slots__ = ('heuristic',)
+
+    def __init__(self, n, heuristic):
+        super().__init__(n)
+        self.heuristic = heuristic
+
+    def assign(self, i, value):
+        self.heuristic.assign(i, value, self.values)
+        self.values[i] = value
+        self.assigned.append(i)
+
+    def undo(self, mark):
+        values, assigned, unassign = self.values, self.assigned, self.heuristic.unassign
+        while len(assigned) > mark:
+            i = assigned.pop()
+            unassign(i, values)
+            values[i] = None
+
+
+def dpll_trail(sentence, n, heuristic=None):
+    """Return a Trail of size n for DPLL on a CompiledCNF, setting up the named
+    branching heuristic, if any, on both."""
+    if heuristic is None:
+        return Trail(n)
+    from heuristics import make_heuristic
+    sentence.heuristic = make_heuristic(heuristic, sentence)
+    return HeuristicTrail(n, sentence.heuristic)
+
+
+def DPLL(sentence, trail, budget=None, start=0) -> bool:
+    """sentence is a CompiledCNF and trail holds the current partial model.
+    Returns whether the model extends to a satisfying one; if so the trail is
+    left holding it, otherwise it is restored to how it was on entry.
+    sentence.variables[:start] are known to be assigned."""
+    #Checking the truth value of the sentence for a given model (can be partial or complete)
+    stats = instrumentation.current
+    model = trail.values
+    mark = trail.mark()
+    while True:
+        value = sentence.evaluate(model)
+        if value is False:
+            if stats is not None:
+                stats.conflicts += 1
+            if sentence.heuristic is not None:
+                sentence.heuristic.conflict(model)
+            trail.undo(mark)
+            return False
+        if value is True:
+            return True
+        if budget is not None:
+            budget.check_time()
+        p, value = find_pure_symbol(sentence, model)
+        if p is not None:
+            if stats is not None:
+                stats.pure_symbols += 1
+        else:
+            p, value = find_unit_clause(sentence, model)
+            if p is None:
+                break
+            if stats is not None:
+                stats.propagations += 1
+        trail.assign(p, value)
+
+    if sentence.heuristic is not None:
+        p, first = sentence.heuristic.pick(model)
+    else:
+        variables = sentence.variables
+        while model[variables[start]] is not None:
+            start += 1
+        p, first = variables[start], sentence.polarity
+    if budget is not None:
+        budget.decision()
+    if stats is not None:
+        stats.decisions += 1
+
+    for value in (first, not first):
+        trail.assign(p, value)
+        if DPLL(sentence, trail, budget, start + 1):
+            return True
+        trail.undo(trail.mark() - 1)
+    trail.undo(mark)
+    return False
     
-def find_pure_symbol(sentence, symbols, model) -> tuple[Expr, bool]:
+def find_pure_symbol(sentence, model) -> tuple[int, bool]:
     """Return a pure symbol and its value if the sentence has a pure symbol"""
-    clauses = set(conjuncts(sentence))
     positive, negative = set(), set()
-    for clause in clauses:
-        if pl_true(clause, model):
+    for evaluate, lits in zip(sentence.clause_evaluators, sentence.clauses):
+        if evaluate(model):
             continue
-        for literal in disjuncts(clause):
-            if list(prop_symbols(literal))[0] not in symbols:
-                continue
-            if literal.op == '~':
-                negative.add(literal.args[0])
-            else:
-                positive.add(literal)
+        for lit in lits:
+            if lit > 0:
+                if model[lit] is None:
+                    positive.add(lit)
+            elif model[-lit] is None:
+                negative.add(-lit)
 
     for p in positive:
         if p not in negative:
@@ -352,14 +1311,13 @@ def find_pure_symbol(sentence, symbols, model) -> tuple[Expr, bool]:
             return n, False
     return None, None
 
-def find_unit_clause(sentence, symbols, model) -> tuple[Expr, bool]:
+def find_unit_clause(sentence, model) -> tuple[int, bool]:
     """Return a unit clause and its value if the sentence has a unit clause"""
-    clauses = set(conjuncts(sentence))
-    for clause in clauses:
-        if pl_true(clause, model):
+    for evaluate, lits in zip(sentence.clause_evaluators, sentence.clauses):
+        if evaluate(model):
             continue
         #clause is guaranteed not to be true at this point, so the literals can only either be false or unknown
-        literals = [prop_symbols(s) for s in disjuncts(clause) if prop_symbols(s) in symbols]
-        if len(literals) == 1:
-            return literals[0], pl_true(clause, extend(model, literals[0], True))
-    return None, None
\ No newline at end of file
+        unassigned = [lit for lit in lits if model[abs(lit)] is None]
+        if len(unassigned) == 1:
+            return abs(unassigned[0]), unassigned[0] > 0
+    return None, None
@@ -0,0 +1,230 @@
+"""Benchmarks for the inference methods over generated KBs.
+
+    python benchmark.py run [--quick] [--output bench.json] [--timeout 10]
+    python benchmark.py compare bench.json baseline.json [--tolerance 0.25]
+    python benchmark.py startup [FILE METHOD] [--repeat 10]
+    python benchmark.py dimacs [FILE.cnf ...] [--output dimacs.json] [--timeout 10]
+
+run sweeps every generator in kb_generators over a range of sizes and runs each
+applicable method, recording build and solve time, peak memory, the search
+counters of the Budget and whether the methods agree on the answer. compare
+exits with status 1 if a result got slower or bigger than the baseline by more
+than the tolerance, or if an answer changed. startup times cold runs of
+iengine.py as it is and with NumPy imported up front, as before the logic core
+was split out of utils. dimacs checks the satisfiability of DIMACS CNF files,
+by default the bundled tests/dimacs instances, with DPLL under each branching
+heuristic and CDCL, printing the nodes (decisions) of each search."""
+
+import argparse
+import glob
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+from budget import Budget, UNKNOWN, within_budget
+from iengine import create_kb, ask
+from dimacs import read_dimacs
+from KB_algo import dpll_satisfiable, cdcl_satisfiable
+from heuristics import HEURISTICS
+from kb_generators import GENERATORS
+from KB_algo import prop_symbols
+from logic_expr import Expr
+
+SWEEPS = {
+    'ksat': [{'n_vars': n, 'seed': 1} for n in (8, 12, 16, 20, 40, 80, 150)],
+    'horn': [{'layers': l, 'width': w} for l, w in ((2, 4), (4, 4), (8, 8), (20, 20), (50, 40))],
+    'pigeonhole': [{'holes': h} for h in (2, 3, 4, 5, 6)],
+    'bicond': [{'length': l, 'width': w} for l, w in ((4, 2), (6, 3), (10, 3), (40, 4))],
+}
+QUICK_SWEEPS = {family: sweep[:3] for family, sweep in SWEEPS.items()}
+
+GENERAL_METHODS = ['TT', 'DPLL', 'CDCL']
+HORN_METHODS = GENERAL_METHODS + ['FC', 'BC']
+# Largest number of symbols each method is tried on; TT is exponential in it.
+MAX_SYMBOLS = {'TT': 18, 'DPLL': 60}
+
+# Differences below this many seconds are never reported as regressions.
+MIN_TIME_DELTA = 0.005
+
+
+def run_one(sentences, query, method, timeout, memory):
+    """Build a KB and ask the query once. Return the measurements as a dict."""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    kb = create_kb(method, sentences)
+    built = time.perf_counter()
+    budget = Budget(timeout=timeout)
+    result = ask(kb, method, query, budget)
+    solved = time.perf_counter()
+    record = {'answer': 'UNKNOWN' if result[0] is UNKNOWN else ('YES' if result[0] else 'NO'),
+              'build_time': round(built - started, 6), 'solve_time': round(solved - built, 6),
+              'decisions': budget.decisions, 'models': budget.models, 'learned': budget.learned}
+    if memory:
+        record['peak_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    return record
+
+
+def run_sweep(sweeps, timeout=10.0, repeat=1, memory=True, log=sys.stderr):
+    records = []
+    for family, sweep in sweeps.items():
+        methods = HORN_METHODS if family == 'horn' else GENERAL_METHODS
+        for params in sweep:
+            sentences, query = GENERATORS[family](**params)
+            n_symbols = len(prop_symbols(Expr('&', *sentences, query)))
+            instance = []
+            for method in methods:
+                if n_symbols > MAX_SYMBOLS.get(method, n_symbols):
+                    continue
+                runs = [run_one(sentences, query, method, timeout, False) for _ in range(repeat)]
+                record = min(runs, key=lambda r: r['solve_time'])
+                if memory:
+                    record['peak_kb'] = run_one(sentences, query, method, timeout, True)['peak_kb']
+                record.update(family=family, params=params, method=method,
+                              symbols=n_symbols, sentences=len(sentences))
+                instance.append(record)
+                print('{:<11}{:<32}{:<6}{:<8}{:>10.4f}s'.format(
+                    family, json.dumps(params), method, record['answer'], record['solve_time']), file=log)
+            answers = {r['answer'] for r in instance if r['answer'] != 'UNKNOWN'}
+            for record in instance:
+                record['agree'] = len(answers) <= 1
+            records.extend(instance)
+    return records
+
+
+def _key(record):
+    return record['family'], json.dumps(record['params'], sort_keys=True), record['method']
+
+
+def compare(records, baseline, tolerance=0.25):
+    """Return a list of human-readable regressions of records against baseline."""
+    base = {_key(r): r for r in baseline}
+    problems = []
+    for r in records:
+        b = base.get(_key(r))
+        name = '{} {} {}'.format(*_key(r))
+        if not r.get('agree', True):
+            problems.append(name + ': methods disagree')
+        if b is None:
+            continue
+        if r['answer'] != b['answer']:
+            problems.append('{}: answer {} (baseline {})'.format(name, r['answer'], b['answer']))
+        for field in ('solve_time', 'build_time'):
+            if r[field] > b[field] * (1 + tolerance) and r[field] - b[field] > MIN_TIME_DELTA:
+                problems.append('{}: {} {:.4f}s (baseline {:.4f}s)'.format(name, field, r[field], b[field]))
+        if 'peak_kb' in r and 'peak_kb' in b and r['peak_kb'] > b['peak_kb'] * (1 + tolerance):
+            problems.append('{}: peak {} KiB (baseline {} KiB)'.format(name, r['peak_kb'], b['peak_kb']))
+    return problems
+
+
+STARTUP_COMMANDS = {
+    'slim': [],
+    'eager': ['-c', 'import numpy, runpy, sys; sys.argv = sys.argv[1:]; '
+                    "runpy.run_path(sys.argv[0], run_name='__main__')", 'iengine.py'],
+}
+
+
+def run_startup(filename, method, repeat=10, log=sys.stderr):
+    """Time cold runs of iengine.py on one file. Return {variant: median seconds}."""
+    medians = {}
+    for variant, prefix in STARTUP_COMMANDS.items():
+        command = [sys.executable] + (prefix or ['iengine.py']) + [filename, method]
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - started)
+        medians[variant] = statistics.median(times)
+        print('{:<6}{:>9.4f}s'.format(variant, medians[variant]), file=log)
+    print('saved {:.1%}'.format(1 - medians['slim'] / medians['eager']), file=log)
+    return medians
+
+
+DIMACS_SOLVERS = {'DPLL': dpll_satisfiable}
+DIMACS_SOLVERS.update(('DPLL:' + name, partial(dpll_satisfiable, heuristic=name)) for name in HEURISTICS)
+DIMACS_SOLVERS['CDCL'] = cdcl_satisfiable
+
+
+def run_dimacs(filenames, timeout=10.0, log=sys.stderr):
+    """Time reading and solving each DIMACS file with each solver. Return the records."""
+    records = []
+    for filename in filenames:
+        for method, solve in DIMACS_SOLVERS.items():
+            started = time.perf_counter()
+            with open(filename) as f:
+                kb = read_dimacs(f)
+            read = time.perf_counter()
+            budget = Budget(timeout=timeout)
+            result = within_budget(budget, solve, kb)
+            solved = time.perf_counter()
+            answer = 'UNKNOWN' if result[0] is UNKNOWN else ('SAT' if result[0] else 'UNSAT')
+            records.append({'file': filename, 'method': method, 'answer': answer,
+                            'variables': len(kb.table), 'clauses': len(kb.clauses),
+                            'read_time': round(read - started, 6), 'solve_time': round(solved - read, 6),
+                            'decisions': budget.decisions})
+            print('{:<28}{:<12}{:<8}{:>10.4f}s{:>9} nodes'.format(filename, method, answer, solved - read,
+                                                                  budget.decisions), file=log)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the inference methods.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the benchmark sweep')
+    run.add_argument('--output', default='bench.json')
+    run.add_argument('--quick', action='store_true', help='only the smallest sizes')
+    run.add_argument('--timeout', type=float, default=10.0, help='budget per query, in seconds')
+    run.add_argument('--repeat', type=int, default=1, help='keep the fastest of this many runs')
+    run.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    run.add_argument('--baseline', help='compare against this file after running')
+    run.add_argument('--tolerance', type=float, default=0.25)
+    cmp = commands.add_parser('compare', help='compare two result files')
+    cmp.add_argument('results')
+    cmp.add_argument('baseline')
+    cmp.add_argument('--tolerance', type=float, default=0.25)
+    startup = commands.add_parser('startup', help='time cold starts of iengine.py')
+    startup.add_argument('filename', nargs='?', default='tests/horn/test1.txt')
+    startup.add_argument('method', nargs='?', default='FC')
+    startup.add_argument('--repeat', type=int, default=10)
+    dimacs = commands.add_parser('dimacs', help='solve DIMACS CNF files')
+    dimacs.add_argument('files', nargs='*', help='default: tests/dimacs/*.cnf')
+    dimacs.add_argument('--output', help='also write the records as JSON')
+    dimacs.add_argument('--timeout', type=float, default=10.0, help='budget per file, in seconds')
+    args = parser.parse_args(argv)
+
+    if args.command == 'dimacs':
+        records = run_dimacs(args.files or sorted(glob.glob('tests/dimacs/*.cnf')), args.timeout)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(records, f, indent=1)
+        return 0
+
+    if args.command == 'startup':
+        run_startup(args.filename, args.method, args.repeat)
+        return 0
+
+    if args.command == 'run':
+        records = run_sweep(QUICK_SWEEPS if args.quick else SWEEPS, args.timeout,
+                            args.repeat, not args.no_memory)
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=1)
+    else:
+        with open(args.results) as f:
+            records = json.load(f)
+    baseline = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = compare(records, baseline, args.tolerance)
+    for p in problems:
+        print(p)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Resource budgets for a single query.
+
+A Budget is passed to the ask_generator_* methods. The search loops charge it
+for every decision, enumerated model and learned item; when a limit is hit it
+raises BudgetExceeded, and the method returns (UNKNOWN, stats) instead of an
+answer."""
+
+import time
+
+
+class _Unknown:
+    """The outcome of a query whose budget ran out. It is falsy, like NO."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'UNKNOWN'
+
+    def __reduce__(self):
+        return 'UNKNOWN'
+
+
+UNKNOWN = _Unknown()
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a search when one of the limits of its Budget is reached."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Budget:
+    """Limits for one query: wall-clock seconds, decisions (branches or
+    inference steps), models enumerated and learned items (clause literals
+    for CDCL, inferred symbols for FC/BC). None means unlimited.
+    The clock starts when the Budget is created or restarted with start()."""
+
+    def __init__(self, timeout=None, max_decisions=None, max_models=None, max_learned=None):
+        self.timeout = timeout
+        self.max_decisions = max_decisions
+        self.max_models = max_models
+        self.max_learned = max_learned
+        self.start()
+
+    def start(self):
+        """Reset the counters and restart the clock."""
+        self.started = time.monotonic()
+        self.deadline = self.started + self.timeout if self.timeout is not None else None
+        self.decisions = self.models = self.learned = 0
+        self.exceeded = None
+
+    def check_time(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._exceed('timeout')
+
+    def decision(self, n=1):
+        self.decisions += n
+        if self.max_decisions is not None and self.decisions > self.max_decisions:
+            self._exceed('max_decisions')
+        self.check_time()
+
+    def model(self, n=1):
+        self.models += n
+        if self.max_models is not None and self.models > self.max_models:
+            self._exceed('max_models')
+        self.check_time()
+
+    def learn(self, n=1):
+        self.learned += n
+        if self.max_learned is not None and self.learned > self.max_learned:
+            self._exceed('max_learned')
+
+    def _exceed(self, reason):
+        self.exceeded = reason
+        raise BudgetExceeded(reason)
+
+    def limits(self):
+        """Return the keyword arguments of a new Budget with the same limits,
+        such as one for a worker process."""
+        limits = {'timeout': self.timeout, 'max_decisions': self.max_decisions,
+                  'max_models': self.max_models, 'max_learned': self.max_learned}
+        return {k: v for k, v in limits.items() if v is not None}
+
+    def report(self):
+        """Return the statistics gathered so far as a dict."""
+        return {'exceeded': self.exceeded, 'elapsed': round(time.monotonic() - self.started, 6),
+                'decisions': self.decisions, 'models': self.models, 'learned': self.learned}
+
+
+def within_budget(budget, fn, *args):
+    """Call fn(*args, budget) and turn a BudgetExceeded into (UNKNOWN, stats)."""
+    if budget is None:
+        return fn(*args)
+    try:
+        return fn(*args, budget)
+    except BudgetExceeded:
+        return UNKNOWN, budget.report()
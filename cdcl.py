@@ -0,0 +1,407 @@
+"""Conflict-driven clause learning (CDCL) SAT solver over integer-encoded literals.
+
+Variables are positive integers 1..n and a literal is +v or -v, as in DIMACS.
+The solver uses two watched literals for unit propagation, learns first-UIP
+clauses on conflict, backjumps non-chronologically, restarts on a Luby
+schedule and branches with VSIDS activity scores plus phase saving."""
+
+import heapq
+import random
+
+from logic_expr import Expr
+
+TRUE, FALSE, UNASSIGNED = 1, -1, 0
+
+
+class SymbolTable:
+    """A two-way map between propositional symbols and the integers 1..n."""
+
+    def __init__(self):
+        self.symbols = [None]
+        self.index = {}
+
+    def __len__(self):
+        return len(self.symbols) - 1
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def var(self, symbol):
+        """Return the integer for symbol, allocating a new one if it is unseen."""
+        v = self.index.get(symbol)
+        if v is None:
+            v = self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return v
+
+    def fresh(self):
+        """Allocate an integer that stands for no symbol, e.g. a clause selector."""
+        self.symbols.append(None)
+        return len(self.symbols) - 1
+
+    def truncate(self, n):
+        """Forget the integers above n and the symbols they stand for."""
+        for s in self.symbols[n + 1:]:
+            if s is not None:
+                del self.index[s]
+        del self.symbols[n + 1:]
+
+    def symbol(self, v):
+        """Return the symbol that the integer (or literal) v stands for."""
+        return self.symbols[abs(v)]
+
+    def literal(self, lit):
+        """Encode a literal Expr, P or ~P, as a signed integer."""
+        if lit.op == '~':
+            return -self.var(lit.args[0])
+        return self.var(lit)
+
+    def clause(self, clause):
+        """Encode a CNF clause Expr as a list of signed integers.
+        Return None for a clause that is trivially true."""
+        if clause is True:
+            return None
+        if clause is False:
+            return []
+        lits = clause.args if clause.op == '|' else (clause,)
+        return [self.literal(lit) for lit in lits]
+
+    def decode(self, lit):
+        """Turn a signed integer back into a literal Expr."""
+        s = self.symbols[abs(lit)]
+        return s if lit > 0 else Expr('~', s)
+
+
+def luby(i):
+    """Return the i-th element (1-based) of the Luby restart sequence 1 1 2 1 1 2 4 ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while True:
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+
+
+class CDCLSolver:
+    """An incremental CDCL solver. Add clauses with add_clause, then call
+    solve, optionally under a list of assumption literals. An optional
+    budget.Budget is charged for decisions and learnt-clause literals.
+    polarity is the phase tried first for a variable never assigned before.
+    A seed gives the variables small random initial activities, so ties are
+    broken differently, and lets random_freq of the decisions pick a random
+    variable. exchange, if set, is told every learnt clause and asked at each
+    restart for clauses to add (see portfolio.ClauseExchange)."""
+
+    def __init__(self, restart_base=100, var_decay=0.95, learnt_ratio=0.5, budget=None,
+                 polarity=False, seed=None, random_freq=0.0):
+        self.num_vars = 0
+        self.clauses = []
+        self.learnts = []
+        self.watches = {}
+        self.value = [UNASSIGNED]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.polarity = [False]
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.order = []
+        self.var_inc = 1.0
+        self.var_decay = var_decay
+        self.restart_base = restart_base
+        self.learnt_ratio = learnt_ratio
+        self.ok = True
+        self.budget = budget
+        self.default_polarity = polarity
+        self.rng = random.Random(seed) if seed is not None else None
+        self.random_freq = random_freq
+        self.exchange = None
+        self.model = None
+        self.stats = {'decisions': 0, 'propagations': 0, 'conflicts': 0,
+                      'restarts': 0, 'learnts': 0}
+
+    # Variables and clauses
+
+    def new_var(self):
+        """Allocate a fresh variable and return it."""
+        self.num_vars += 1
+        v = self.num_vars
+        self.value.append(UNASSIGNED)
+        self.level.append(0)
+        self.reason.append(None)
+        act = self.rng.random() * 1e-3 if self.rng is not None else 0.0
+        self.activity.append(act)
+        self.polarity.append(self.default_polarity)
+        self.watches[v] = []
+        self.watches[-v] = []
+        heapq.heappush(self.order, (-act, v))
+        return v
+
+    def ensure_vars(self, n):
+        """Make sure the variables 1..n exist."""
+        while self.num_vars < n:
+            self.new_var()
+
+    def lit_value(self, lit):
+        """Return TRUE, FALSE or UNASSIGNED for a signed literal."""
+        return self.value[lit] if lit > 0 else -self.value[-lit]
+
+    def add_clause(self, lits):
+        """Add a clause (an iterable of signed ints) at decision level 0.
+        Return False if the clause set has become unsatisfiable."""
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        clause = []
+        seen = set()
+        for lit in lits:
+            self.ensure_vars(abs(lit))
+            if -lit in seen:
+                return True
+            if lit in seen:
+                continue
+            val = self.lit_value(lit)
+            if val == TRUE:
+                return True
+            if val == FALSE:
+                continue
+            seen.add(lit)
+            clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self.clauses.append(clause)
+            self._watch(clause)
+        return self.ok
+
+    def _watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    # Assignment trail
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def _enqueue(self, lit, reason):
+        v = abs(lit)
+        self.value[v] = TRUE if lit > 0 else FALSE
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def _cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        value, polarity, activity, order = self.value, self.polarity, self.activity, self.order
+        for lit in self.trail[start:]:
+            v = abs(lit)
+            polarity[v] = lit > 0
+            value[v] = UNASSIGNED
+            self.reason[v] = None
+            heapq.heappush(order, (-activity[v], v))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = min(self.qhead, start)
+
+    def _propagate(self):
+        """Propagate all enqueued assignments. Return a conflicting clause or None."""
+        value, watches, trail = self.value, self.watches, self.trail
+        while self.qhead < len(trail):
+            p = trail[self.qhead]
+            self.qhead += 1
+            self.stats['propagations'] += 1
+            false_lit = -p
+            ws = watches[false_lit]
+            kept = []
+            i, n = 0, len(ws)
+            while i < n:
+                c = ws[i]
+                i += 1
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], false_lit
+                first = c[0]
+                fv = value[first] if first > 0 else -value[-first]
+                if fv == TRUE:
+                    kept.append(c)
+                    continue
+                for k in range(2, len(c)):
+                    lit = c[k]
+                    if (value[lit] if lit > 0 else -value[-lit]) != FALSE:
+                        c[1], c[k] = lit, false_lit
+                        watches[lit].append(c)
+                        break
+                else:
+                    kept.append(c)
+                    if fv == FALSE:
+                        kept.extend(ws[i:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return c
+                    self._enqueue(first, c)
+            watches[false_lit] = kept
+        return None
+
+    # Conflict analysis
+
+    def _bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.order = [(-self.activity[u], u) for u in range(1, self.num_vars + 1)
+                          if self.value[u] == UNASSIGNED]
+            heapq.heapify(self.order)
+        elif self.value[v] == UNASSIGNED:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def _analyze(self, confl):
+        """Derive the first-UIP clause from a conflict. Return it with the backjump level."""
+        level, reason, trail = self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learnt = [0]
+        seen = set()
+        counter = 0
+        p = None
+        index = len(trail) - 1
+        while True:
+            for q in (confl if p is None else confl[1:]):
+                v = abs(q)
+                if v not in seen and level[v] > 0:
+                    seen.add(v)
+                    self._bump(v)
+                    if level[v] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(trail[index]) not in seen:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            confl = reason[abs(p)]
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = -p
+        if len(learnt) == 1:
+            return learnt, 0
+        best = max(range(1, len(learnt)), key=lambda i: level[abs(learnt[i])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def _reduce_learnts(self):
+        """Forget the longer half of the learnt clauses. Only called at level 0."""
+        self.learnts.sort(key=len)
+        keep = len(self.learnts) // 2
+        dropped = {id(c) for c in self.learnts[keep:] if len(c) > 2}
+        if not dropped:
+            return
+        self.learnts = [c for c in self.learnts if id(c) not in dropped]
+        for lit, ws in self.watches.items():
+            self.watches[lit] = [c for c in ws if id(c) not in dropped]
+
+    # Search
+
+    def _pick_branch_lit(self):
+        order, value, activity = self.order, self.value, self.activity
+        if (self.random_freq and self.num_vars and self.rng is not None
+                and self.rng.random() < self.random_freq):
+            v = self.rng.randint(1, self.num_vars)
+            if value[v] == UNASSIGNED:
+                return v if self.polarity[v] else -v
+        while order:
+            act, v = heapq.heappop(order)
+            if value[v] == UNASSIGNED and -act == activity[v]:
+                return v if self.polarity[v] else -v
+        return None
+
+    def solve(self, assumptions=()):
+        """Return True if the clauses are satisfiable under the assumptions.
+        On success the satisfying assignment is left in self.model as {var: bool}."""
+        self.model = None
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        if self._propagate() is not None:
+            self.ok = False
+            return False
+        assumptions = list(assumptions)
+        for lit in assumptions:
+            self.ensure_vars(abs(lit))
+        max_learnts = max(len(self.clauses) * self.learnt_ratio, 1000)
+        restart = 0
+        while True:
+            restart += 1
+            result = self._search(self.restart_base * luby(restart), assumptions)
+            if result is not None:
+                self._cancel_until(0)
+                return result
+            self.stats['restarts'] += 1
+            self._cancel_until(0)
+            if self.exchange is not None:
+                for lits in self.exchange.collect():
+                    if not self.add_clause(lits):
+                        return False
+            if len(self.learnts) > max_learnts:
+                self._reduce_learnts()
+                max_learnts *= 1.1
+
+    def _search(self, conflict_limit, assumptions):
+        conflicts = 0
+        stats = self.stats
+        budget = self.budget
+        while True:
+            confl = self._propagate()
+            if confl is not None:
+                stats['conflicts'] += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, back_level = self._analyze(confl)
+                self._cancel_until(back_level)
+                if self.exchange is not None:
+                    self.exchange.export(learnt)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self.learnts.append(learnt)
+                    self._watch(learnt)
+                    stats['learnts'] += 1
+                    if budget is not None:
+                        budget.learn(len(learnt))
+                    self._enqueue(learnt[0], learnt)
+                self.var_inc /= self.var_decay
+                continue
+            if conflicts >= conflict_limit:
+                return None
+            next_lit = None
+            while len(self.trail_lim) < len(assumptions):
+                p = assumptions[len(self.trail_lim)]
+                val = self.lit_value(p)
+                if val == TRUE:
+                    self.trail_lim.append(len(self.trail))
+                elif val == FALSE:
+                    return False
+                else:
+                    next_lit = p
+                    break
+            if next_lit is None:
+                next_lit = self._pick_branch_lit()
+                if next_lit is None:
+                    self.model = {v: self.value[v] == TRUE for v in range(1, self.num_vars + 1)}
+                    return True
+                stats['decisions'] += 1
+                if budget is not None:
+                    budget.decision()
+            self.trail_lim.append(len(self.trail))
+            self._enqueue(next_lit, None)
@@ -0,0 +1,201 @@
+"""Model counting (#SAT) and model enumeration over int clauses.
+
+count_models runs a DPLL search that conditions the clauses on each branch,
+unit-propagates, and splits what is left into connected components (clauses
+linked by shared variables), whose counts multiply. The count of each
+component is cached under its set of clauses, so a sub-formula reached again
+by another path is counted only once. Variables that drop out of every clause
+contribute a factor of 2 each.
+
+count_entails answers like tt_entails_compiled, count included, without the
+2^n enumeration. models yields the models one at a time."""
+
+from cdcl import CDCLSolver
+from KB_algo import to_cnf, prop_symbols, variables
+import instrumentation
+
+
+def simplify(clauses, lits):
+    """Condition the clauses on the literals and unit-propagate. Return the
+    clauses left (none satisfied, no false literals, no units) and the set of
+    literals assigned, or (None, None) if a clause becomes false."""
+    assigned = set()
+    for lit in lits:
+        if -lit in assigned:
+            return None, None
+        assigned.add(lit)
+    while True:
+        residual, units = [], []
+        for c in clauses:
+            if any(lit in assigned for lit in c):
+                continue
+            r = tuple(lit for lit in c if -lit not in assigned)
+            if not r:
+                return None, None
+            if len(r) == 1:
+                units.append(r[0])
+            else:
+                residual.append(r)
+        if not units:
+            return residual, assigned
+        for lit in units:
+            if -lit in assigned:
+                return None, None
+            assigned.add(lit)
+        clauses = residual
+
+
+def components(clauses):
+    """Split clauses into lists that share no variables, by union-find.
+    An empty clause has no variables, so it is a component on its own."""
+    parent = {}
+
+    def find(v):
+        root = parent.setdefault(v, v)
+        while root != parent[root]:
+            parent[root] = parent[parent[root]]
+            root = parent[root]
+        return root
+
+    for c in clauses:
+        if not c:
+            continue
+        first = find(abs(c[0]))
+        for lit in c[1:]:
+            other = find(abs(lit))
+            if other != first:
+                parent[other] = first
+    groups, empty = {}, []
+    for c in clauses:
+        if c:
+            groups.setdefault(find(abs(c[0])), []).append(c)
+        else:
+            empty.append([c])
+    return list(groups.values()) + empty
+
+
+def clause_variables(clauses):
+    return {abs(lit) for c in clauses for lit in c}
+
+
+class ModelCounter:
+    """Counts models of int clauses; the component cache is kept across calls,
+    since the count of a set of clauses does not depend on how it was reached."""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.cache = {}
+
+    def count(self, clauses, variables, assumptions=()):
+        """Return the number of assignments to variables (which must include the
+        variables of the clauses and assumptions) that satisfy the clauses and
+        the assumption literals."""
+        residual, assigned = simplify(clauses, assumptions)
+        if residual is None:
+            return 0
+        n = 2 ** (len(set(variables)) - len({abs(lit) for lit in assigned})
+                  - len(clause_variables(residual)))
+        for component in components(residual):
+            n *= self.count_component(component)
+            if not n:
+                break
+        return n
+
+    def count_component(self, clauses):
+        """The number of models of connected clauses over their own variables."""
+        key = frozenset(clauses)
+        if key in self.cache:
+            return self.cache[key]
+        if not all(clauses):
+            return 0
+        occurrences = {}
+        for c in clauses:
+            for lit in c:
+                occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+        v = max(occurrences, key=occurrences.get)
+        if self.budget is not None:
+            self.budget.decision()
+        stats = instrumentation.current
+        if stats is not None:
+            stats.decisions += 1
+        total = 0
+        for lit in (v, -v):
+            residual, assigned = simplify(clauses, [lit])
+            if residual is None:
+                continue
+            n = 2 ** (len(occurrences) - len(assigned) - len(clause_variables(residual)))
+            for component in components(residual):
+                n *= self.count_component(component)
+                if not n:
+                    break
+            total += n
+        self.cache[key] = total
+        return total
+
+
+def count_models(clauses, variables, assumptions=(), budget=None):
+    """The number of assignments to variables that satisfy the int clauses
+    and the assumption literals."""
+    return ModelCounter(budget).count(clauses, variables, assumptions)
+
+
+def count_entails(kb, alpha, cnf='distribute', budget=None):
+    """tt_entails_compiled by counting: return (entailed, number_of_kb_models)
+    for a CompiledKB kb and sentence alpha, with the same count TT reports.
+    TT enumerates the models over the KB's variables and alpha's, in variable
+    order with True first, counting those where KB and alpha hold, and stops
+    at the first where KB holds and alpha does not. If there is none, the
+    count is that of all KB models. Otherwise this finds that first
+    counterexample with a SAT solver and counts the KB models before it."""
+    assert not variables(alpha)
+    table = kb.table
+    symbols = kb.variables([[table.var(s) for s in prop_symbols(alpha)]])
+    counter = ModelCounter(budget)
+    solver = CDCLSolver(budget=budget)
+    for lits in kb.clauses + kb.encode_cnf(to_cnf(~alpha, cnf)):
+        solver.add_clause(lits)
+    if not solver.solve():
+        return True, counter.count(kb.clauses, symbols)
+    # The first counterexample in TT's order, fixing one variable at a time.
+    model, prefix, count = solver.model, [], 0
+    for v in symbols:
+        if model.get(v) or solver.solve(prefix + [v]):
+            if not model.get(v):
+                model = solver.model
+            prefix.append(v)
+        else:
+            count += counter.count(kb.clauses, symbols, prefix + [v])
+            prefix.append(-v)
+    return False, count
+
+
+def models(clauses, variables, budget=None):
+    """Yield every assignment to variables satisfying the int clauses, as a
+    {variable: value} dict, one at a time."""
+    variables = sorted(set(variables))
+    residual, assigned = simplify(clauses, ())
+    if residual is not None:
+        yield from _models(residual, assigned, variables, budget)
+
+
+def _models(clauses, assigned, variables, budget):
+    if not clauses:
+        free = [v for v in variables if v not in assigned and -v not in assigned]
+        base = {abs(lit): lit > 0 for lit in assigned}
+        for i in range(2 ** len(free)):
+            model = dict(base)
+            for j, v in enumerate(free):
+                model[v] = not (i >> (len(free) - 1 - j)) & 1
+            yield model
+        return
+    occurrences = {}
+    for c in clauses:
+        for lit in c:
+            occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+    v = max(occurrences, key=occurrences.get)
+    if budget is not None:
+        budget.decision()
+    for lit in (v, -v):
+        residual, more = simplify(clauses, [lit])
+        if residual is not None:
+            yield from _models(residual, assigned | more, variables, budget)
@@ -0,0 +1,261 @@
+"""Cube-and-conquer: split a CNF search into independent sub-problems.
+
+A lookahead phase picks split variables: for each candidate it unit-propagates
+both values and prefers the variable whose two branches fix the most other
+variables (the product of the two counts). A value whose propagation fails is
+fixed at once (a failed literal), and a node where both fail is dropped. The
+split decisions down to a given depth form the cubes: partial assignments
+that together cover every model not refuted during lookahead.
+
+Each cube is then solved as its own problem by DPLL or CDCL, on a pool of
+worker processes. The first satisfiable cube ends the search. Per-cube
+counters are added to the current InferenceStats as stats.cubes."""
+
+import math
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+
+from budget import Budget, BudgetExceeded, UNKNOWN
+from cdcl import CDCLSolver
+from KB_algo import CompiledKB, CompiledCNF, Trail, DPLL, to_cnf, hide_aux, solver_model
+from logic_expr import expr
+import instrumentation
+
+
+def propagate(clauses, occurs, values, lits):
+    """Assign lits in the array model values and unit-propagate over clauses,
+    using occurs[lit], the indexes of the clauses containing lit. Return the
+    variables assigned, or None on a conflict, in which case values is
+    left as it was."""
+    assigned = []
+    stack = list(lits)
+    while stack:
+        lit = stack.pop()
+        v, value = abs(lit), lit > 0
+        if values[v] is not None:
+            if values[v] != value:
+                break
+            continue
+        values[v] = value
+        assigned.append(v)
+        for i in occurs[-lit]:
+            unit = None
+            free = 0
+            for l in clauses[i]:
+                x = values[abs(l)]
+                if x is None:
+                    free += 1
+                    unit = l
+                elif x == (l > 0):
+                    break
+            else:
+                if free == 0:
+                    stack = None
+                    break
+                if free == 1:
+                    stack.append(unit)
+        if stack is None:
+            break
+    else:
+        return assigned
+    for v in assigned:
+        values[v] = None
+    return None
+
+
+def make_cubes(kb, extra=(), depth=4, candidates=30):
+    """Return the cubes, as tuples of int literals, for the clauses of the
+    CompiledKB kb plus extra. Lookahead tries the candidates unassigned
+    variables that occur in the most clauses. No cubes means unsatisfiable."""
+    clauses = kb.clauses + list(extra)
+    occurs = defaultdict(list)
+    for i, lits in enumerate(clauses):
+        for lit in lits:
+            occurs[lit].append(i)
+    if any(not lits for lits in clauses):
+        return []
+    variables = sorted(kb.variables(extra), key=lambda v: -len(occurs[v]) - len(occurs[-v]))
+    values = [None] * (len(kb.table) + 1)
+    if propagate(clauses, occurs, values, [lits[0] for lits in clauses if len(lits) == 1]) is None:
+        return []
+    cubes = []
+
+    def split(cube, level):
+        fixed = []
+        while True:
+            best, best_score, forced = None, -1, None
+            for v in [v for v in variables if values[v] is None][:candidates]:
+                sizes = []
+                for lit in (v, -v):
+                    assigned = propagate(clauses, occurs, values, [lit])
+                    sizes.append(None if assigned is None else len(assigned))
+                    for u in assigned or ():
+                        values[u] = None
+                if None in sizes:
+                    forced = v if sizes[0] is not None else -v if sizes[1] is not None else 0
+                    break
+                if sizes[0] * sizes[1] > best_score:
+                    best, best_score = v, sizes[0] * sizes[1]
+            if forced is None:
+                break
+            if forced == 0:
+                for u in fixed:
+                    values[u] = None
+                return
+            fixed.extend(propagate(clauses, occurs, values, [forced]))
+            cube += (forced,)
+        if best is None or level == depth:
+            cubes.append(cube)
+        else:
+            for lit in (best, -best):
+                assigned = propagate(clauses, occurs, values, [lit])
+                split(cube + (lit,), level + 1)
+                for u in assigned:
+                    values[u] = None
+        for u in fixed:
+            values[u] = None
+
+    split((), 0)
+    return cubes
+
+
+def solve_cube(kb, extra, cube, engine='dpll', budget=None, solver=None):
+    """Solve the clauses of kb plus extra under the cube. Return (satisfiable,
+    model, stats) with the model as a {variable: value} dict. A CDCLSolver
+    already holding the clauses may be passed in and is reused."""
+    started = time.perf_counter()
+    if engine == 'cdcl':
+        if solver is None:
+            solver = CDCLSolver(budget=budget)
+            for lits in kb.clauses + list(extra):
+                solver.add_clause(lits)
+        solver.budget = budget
+        before = dict(solver.stats)
+        satisfiable = solver.solve(cube)
+        stats = {key: solver.stats[key] - before.get(key, 0)
+                 for key in ('decisions', 'propagations', 'conflicts')}
+        model = solver.model if satisfiable else None
+    else:
+        compiled = CompiledCNF(kb, extra)
+        trail = Trail(len(kb.table) + 1)
+        for lit in cube:
+            trail.assign(abs(lit), lit > 0)
+        with instrumentation.collect_stats() as counters:
+            satisfiable = DPLL(compiled, trail, budget)
+        stats = {key: getattr(counters, key) for key in ('decisions', 'propagations', 'conflicts')}
+        model = {v: trail.values[v] for v in compiled.variables if trail.values[v] is not None} if satisfiable else None
+    stats['seconds'] = round(time.perf_counter() - started, 6)
+    return satisfiable, model, stats
+
+
+_worker_state = None
+
+
+def _init_worker(kb, extra, engine, limits):
+    global _worker_state
+    solver = None
+    if engine == 'cdcl':
+        solver = CDCLSolver()
+        for lits in kb.clauses + list(extra):
+            solver.add_clause(lits)
+    _worker_state = kb, extra, engine, limits, solver
+
+
+def _solve_in_worker(item, budget=None):
+    index, cube = item
+    kb, extra, engine, limits, solver = _worker_state
+    if budget is None and limits:
+        budget = Budget(**limits)
+    try:
+        satisfiable, model, stats = solve_cube(kb, extra, cube, engine, budget, solver)
+    except BudgetExceeded as e:
+        satisfiable, model, stats = UNKNOWN, e.reason, {}
+    return index, satisfiable, model, stats
+
+
+def conquer(kb, extra=(), cubes=(), engine='dpll', workers=None, budget=None):
+    """Solve the cubes on a pool of worker processes (in this process if there
+    is only one worker). Return (satisfiable, model, cube_stats), where
+    cube_stats has one dict per cube solved, or raise BudgetExceeded if a cube
+    ran out of budget and none was satisfiable."""
+    workers = min(workers or os.cpu_count() or 1, max(len(cubes), 1))
+    limits = {} if budget is None else budget.limits()
+    deadline = budget.deadline if budget is not None else None
+    cube_stats = []
+    reason = None
+    if workers == 1:
+        _init_worker(kb, extra, engine, limits)
+        results = (_solve_in_worker(item, budget) for item in enumerate(cubes))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, _init_worker, (kb, extra, engine, limits))
+        results = pool.imap_unordered(_solve_in_worker, enumerate(cubes))
+    try:
+        for _ in cubes:
+            try:
+                if pool is None:
+                    index, satisfiable, model, stats = next(results)
+                else:
+                    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    index, satisfiable, model, stats = results.next(timeout)
+            except multiprocessing.TimeoutError:
+                reason = 'timeout'
+                break
+            cube_stats.append(dict(stats, cube=list(cubes[index]),
+                                   result='unknown' if satisfiable is UNKNOWN else
+                                   'sat' if satisfiable else 'unsat'))
+            if satisfiable is UNKNOWN:
+                reason = model
+            elif satisfiable:
+                return True, model, cube_stats
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if reason is not None:
+        if budget is None:
+            raise RuntimeError('cube search stopped without an answer')
+        budget.exceeded = reason
+        raise BudgetExceeded(reason)
+    return False, None, cube_stats
+
+
+def default_depth(workers=None):
+    """A split depth giving about four cubes per worker."""
+    return max(1, math.ceil(math.log2(4 * (workers or os.cpu_count() or 1))))
+
+
+def cube_satisfiable(KB, budget=None, depth=None, workers=None, engine='dpll'):
+    """Is the CompiledKB KB satisfiable? Returns (satisfiable, model) by cube-and-conquer."""
+    satisfiable, model = _cube_and_conquer(KB, (), budget, depth, workers, engine)
+    if satisfiable:
+        return True, solver_model(KB, model, KB.variables())
+    return False, None
+
+
+def cube_entails(KB, q, cnf='distribute', budget=None, depth=None, workers=None, engine='dpll'):
+    """Check if KB (a CompiledKB or a list of CNF clauses) entails q by
+    cube-and-conquer. Returns the same (entailed, model) pair as dpll_entails."""
+    KB = KB if isinstance(KB, CompiledKB) else CompiledKB(KB)
+    with instrumentation.phase('cnf'):
+        negated = KB.encode_cnf(to_cnf(~expr(q), cnf))
+    satisfiable, model = _cube_and_conquer(KB, negated, budget, depth, workers, engine)
+    if satisfiable:
+        return False, hide_aux(solver_model(KB, model, KB.variables(negated)))
+    return True, None
+
+
+def _cube_and_conquer(KB, extra, budget, depth, workers, engine):
+    """Return (satisfiable, {variable: value} model) for the clauses of KB plus extra."""
+    stats = instrumentation.current
+    with instrumentation.phase('lookahead'):
+        cubes = make_cubes(KB, extra, depth or default_depth(workers))
+    satisfiable, model, cube_stats = conquer(KB, extra, cubes, engine, workers, budget)
+    if stats is not None:
+        stats.cubes.extend(cube_stats)
+        for item in cube_stats:
+            for key in ('decisions', 'propagations', 'conflicts'):
+                setattr(stats, key, getattr(stats, key) + item.get(key, 0))
+    return satisfiable, model
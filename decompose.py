@@ -0,0 +1,114 @@
+"""Splitting a KB into independent components before solving.
+
+Clauses that share no variables, directly or through other clauses, are
+independent: the KB's models are all combinations of the models of its
+components. So KB |= q exactly when the components sharing variables with q
+entail it, or when some other component is unsatisfiable. The components are
+found with union-find over the variable-clause incidence graph (see
+counting.components); the query is solved on the relevant ones only, and the
+rest are just checked for satisfiability, in parallel processes when there
+are enough of them to pay for it.
+
+Every function here takes a CompiledKB; the sub-KBs share its symbol table."""
+
+import multiprocessing
+import os
+
+from budget import Budget, BudgetExceeded
+from counting import components, ModelCounter, count_entails
+from KB_algo import (CompiledKB, dpll_entails, cdcl_satisfiable, tt_entails_compiled, prop_symbols,
+                     hide_aux)
+
+# Satisfiability checks of other components go to a process pool only when
+# there are at least this many clauses in them.
+PARALLEL_MIN_CLAUSES = 5000
+
+
+def sub_kb(kb, clauses):
+    """A CompiledKB of some of kb's int clauses, sharing its symbol table."""
+    sub = CompiledKB()
+    sub.table = kb.table
+    for lits in clauses:
+        sub.add_lits(lits)
+    return sub
+
+
+def split(kb, variables=()):
+    """Return (relevant, others): a CompiledKB of the components of kb that
+    contain any of the variables, and one CompiledKB per other component."""
+    variables = set(variables)
+    relevant, others = [], []
+    for clauses in components(kb.clauses):
+        if any(abs(lit) in variables for lits in clauses for lit in lits):
+            relevant.extend(clauses)
+        else:
+            others.append(sub_kb(kb, clauses))
+    return sub_kb(kb, relevant), others
+
+
+def query_variables(kb, q):
+    return [kb.table.var(s) for s in prop_symbols(q)]
+
+
+def _satisfiable_with_limits(part, limits):
+    return cdcl_satisfiable(part, Budget(**limits) if limits else None)
+
+
+def satisfiable_parts(parts, budget=None, workers=None):
+    """Check each CompiledKB with CDCL. Return (True, model) with the models
+    merged if they are all satisfiable, else (False, None)."""
+    workers = min(workers or os.cpu_count() or 1, len(parts))
+    if workers > 1 and sum(len(part.clauses) for part in parts) >= PARALLEL_MIN_CLAUSES:
+        limits = {} if budget is None else budget.limits()
+        with multiprocessing.Pool(workers) as pool:
+            try:
+                results = pool.starmap(_satisfiable_with_limits, [(part, limits) for part in parts])
+            except BudgetExceeded as e:
+                budget.exceeded = e.reason
+                raise
+    else:
+        results = []
+        for part in parts:
+            results.append(cdcl_satisfiable(part, budget))
+            if not results[-1][0]:
+                break
+    model = {}
+    for satisfiable, part_model in results:
+        if not satisfiable:
+            return False, None
+        model.update(part_model)
+    return True, model
+
+
+def decomposed_entails(kb, q, cnf='distribute', budget=None, entails=dpll_entails, workers=None):
+    """Check if the CompiledKB kb entails q with entails (dpll_entails,
+    cdcl_entails, ...) on the components of kb that share symbols with q.
+    Returns the same (entailed, model) pair as entails; a counterexample
+    includes models of the other components."""
+    relevant, others = split(kb, query_variables(kb, q))
+    entailed, model = entails(relevant, q, cnf, budget)
+    if entailed:
+        return True, model
+    satisfiable, others_model = satisfiable_parts(others, budget, workers)
+    if not satisfiable:
+        return True, None
+    return False, hide_aux({**(model or {}), **others_model})
+
+
+def decomposed_tt_entails(kb, q, budget=None, workers=None):
+    """tt_entails_compiled on the components of kb that share symbols with q:
+    the truth table is enumerated over their symbols only. The count is that
+    of tt_entails_compiled on the whole KB, with the models of the other
+    components counted by counting.ModelCounter."""
+    relevant, others = split(kb, query_variables(kb, q))
+    entailed, count = tt_entails_compiled(relevant, q, budget)
+    if entailed:
+        counter = ModelCounter(budget)
+        for part in others:
+            count *= counter.count(part.clauses, part.variables())
+        return True, count
+    if not satisfiable_parts(others, budget, workers)[0]:
+        return True, 0
+    # TT stops at its first counterexample over all the variables, whose
+    # position depends on the other components too.
+    return count_entails(kb, q, 'distribute', budget)
@@ -0,0 +1,96 @@
+"""Reading and writing DIMACS CNF.
+
+A DIMACS file has comment lines starting with 'c', a header 'p cnf VARS CLAUSES'
+and then clauses as signed variable numbers, each ended by 0. Clauses may span
+lines; SATLIB files end with a '%' line, which is ignored.
+
+Variable v is the symbol X<v> unless the file names it with a comment line
+'c symbol v NAME', which write_dimacs emits for every variable, so a PropKB
+written and read back keeps its symbol names.
+
+read_dimacs fills a CompiledKB straight from the integers, without building an
+Expr per clause; load_dimacs also builds the Expr clauses of a PropKB."""
+
+from logic_expr import Expr, Symbol, intern_expr
+from KB_algo import CompiledKB, PropKB
+
+
+def iter_dimacs(stream):
+    """Yield ('symbol', (v, name)), ('header', (vars, clauses)) and ('clause', lits)
+    items from a DIMACS stream, one line at a time."""
+    lits = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == 'c':
+            words = line.split()
+            if len(words) == 4 and words[1] == 'symbol' and words[2].isdigit():
+                yield 'symbol', (int(words[2]), words[3])
+            continue
+        if line[0] == 'p':
+            words = line.split()
+            if len(words) != 4 or words[1] != 'cnf':
+                raise SyntaxError('Bad DIMACS header: ' + line)
+            yield 'header', (int(words[2]), int(words[3]))
+            continue
+        if line[0] == '%':
+            break
+        for word in line.split():
+            lit = int(word)
+            if lit:
+                lits.append(lit)
+            else:
+                yield 'clause', tuple(lits)
+                lits = []
+    if lits:
+        yield 'clause', tuple(lits)
+
+
+def read_dimacs(stream, kb=None):
+    """Read DIMACS clauses into a CompiledKB (a new one unless kb is given) and
+    return it. Variable v is numbered v in the KB's table when the table is
+    empty to start with."""
+    kb = kb if kb is not None else CompiledKB()
+    table = kb.table
+    names = {}
+    numbering = [None]
+
+    def var(v):
+        while len(numbering) <= v:
+            n = len(numbering)
+            numbering.append(table.var(Symbol(names.get(n, 'X{}'.format(n)))))
+        return numbering[v]
+
+    for kind, value in iter_dimacs(stream):
+        if kind == 'clause':
+            lits = tuple(dict.fromkeys(var(lit) if lit > 0 else -var(-lit) for lit in value))
+            if not any(-lit in lits for lit in lits):
+                kb.add_lits(lits)
+        elif kind == 'symbol':
+            names[value[0]] = value[1]
+        else:
+            var(value[0])
+    return kb
+
+
+def load_dimacs(stream, kb=None):
+    """Read DIMACS clauses into a PropKB (a new one unless kb is given) and return it."""
+    kb = kb if kb is not None else PropKB()
+    compiled = read_dimacs(stream)
+    decode = compiled.table.decode
+    kb.add_clauses([intern_expr(Expr('|', *map(decode, lits)) if len(lits) > 1 else
+                                decode(lits[0]) if lits else False) for lits in compiled.clauses])
+    return kb
+
+
+def write_dimacs(kb, stream):
+    """Write the clauses of a PropKB or CompiledKB to a stream as DIMACS CNF."""
+    compiled = kb.compiled if isinstance(kb, PropKB) else kb
+    symbols = compiled.table.symbols
+    for v in range(1, len(symbols)):
+        if symbols[v] is not None:
+            stream.write('c symbol {} {}\n'.format(v, symbols[v]))
+    stream.write('p cnf {} {}\n'.format(len(compiled.table), len(compiled.clauses)))
+    for lits in compiled.clauses:
+        stream.write(' '.join(map(str, lits)) + ' 0\n')
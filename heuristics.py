@@ -0,0 +1,212 @@
+"""Branching heuristics for DPLL.
+
+A heuristic is built for one CompiledCNF and told about every assignment and
+unassignment on the trail (see HeuristicTrail in KB_algo), before the model
+changes, so its scores are kept up to date incrementally instead of being
+recomputed at each decision. DPLL calls pick(model) for the variable and value
+to branch on, and conflict(model) when the model falsifies a clause.
+
+    'vsids'  activity of the variables of falsified clauses, bumped by an
+             increment that grows at each conflict, so old bumps decay; the
+             most active variable is kept on top of a heap
+    'dlis'   the literal occurring in most unsatisfied clauses
+    'moms'   the variable occurring most in the shortest unsatisfied clauses
+    'jw'     Jeroslow-Wang: the variable with the largest sum of 2**-size over
+             the unsatisfied clauses containing it, sizes counting only
+             unassigned literals
+
+Counts are over the unassigned literals of clauses not yet satisfied."""
+
+import heapq
+from collections import defaultdict
+
+
+class ClauseHeuristic:
+    """Keeps, for each clause, how many of its literals are true and how many
+    are unassigned, and calls _count(lits, size, +1/-1) whenever the unassigned
+    literals of a clause with no true literal change."""
+
+    def __init__(self, sentence):
+        self.sentence = sentence
+        self.clauses = sentence.clauses
+        self.occurs = defaultdict(list)
+        for i, lits in enumerate(self.clauses):
+            for lit in lits:
+                self.occurs[lit].append(i)
+        self.true = [0] * len(self.clauses)
+        self.size = [len(lits) for lits in self.clauses]
+        for lits in self.clauses:
+            self._count(lits, len(lits), 1)
+
+    def _count(self, lits, size, delta):
+        raise NotImplementedError
+
+    def _free(self, i, model, v, with_v):
+        return [lit for lit in self.clauses[i]
+                if (with_v if abs(lit) == v else model[abs(lit)] is None)]
+
+    def assign(self, v, value, model):
+        lit = v if value else -v
+        for i in self.occurs[lit]:
+            if self.true[i] == 0:
+                self._count(self._free(i, model, v, True), self.size[i], -1)
+            self.true[i] += 1
+            self.size[i] -= 1
+        for i in self.occurs[-lit]:
+            if self.true[i] == 0:
+                self._count(self._free(i, model, v, True), self.size[i], -1)
+                self._count(self._free(i, model, v, False), self.size[i] - 1, 1)
+            self.size[i] -= 1
+
+    def unassign(self, v, model):
+        lit = v if model[v] else -v
+        for i in self.occurs[-lit]:
+            if self.true[i] == 0:
+                self._count(self._free(i, model, v, False), self.size[i], -1)
+                self._count(self._free(i, model, v, True), self.size[i] + 1, 1)
+            self.size[i] += 1
+        for i in self.occurs[lit]:
+            self.true[i] -= 1
+            self.size[i] += 1
+            if self.true[i] == 0:
+                self._count(self._free(i, model, v, True), self.size[i], 1)
+
+    def conflict(self, model):
+        pass
+
+
+class DLIS(ClauseHeuristic):
+    """Dynamic largest individual sum."""
+
+    def __init__(self, sentence):
+        self.counts = defaultdict(int)
+        super().__init__(sentence)
+
+    def _count(self, lits, size, delta):
+        counts = self.counts
+        for lit in lits:
+            counts[lit] += delta
+
+    def pick(self, model):
+        counts = self.counts
+        best, best_score = None, -1
+        for v in self.sentence.variables:
+            if model[v] is None:
+                for lit in (v, -v):
+                    if counts[lit] > best_score:
+                        best, best_score = lit, counts[lit]
+        return abs(best), best > 0
+
+
+class JeroslowWang(ClauseHeuristic):
+    """Two-sided Jeroslow-Wang."""
+
+    def __init__(self, sentence):
+        self.weights = defaultdict(float)
+        super().__init__(sentence)
+
+    def _count(self, lits, size, delta):
+        weights = self.weights
+        w = delta * 2.0 ** -size
+        for lit in lits:
+            weights[lit] += w
+
+    def pick(self, model):
+        weights = self.weights
+        best, best_score = None, -1.0
+        for v in self.sentence.variables:
+            if model[v] is None:
+                score = weights[v] + weights[-v]
+                if score > best_score:
+                    best, best_score = v, score
+        return best, weights[best] >= weights[-best]
+
+
+class MOMS(ClauseHeuristic):
+    """Maximum occurrences in clauses of minimum size."""
+
+    def __init__(self, sentence, k=1):
+        self.k = k
+        self.clauses_of_size = defaultdict(int)
+        self.counts = defaultdict(lambda: defaultdict(int))
+        super().__init__(sentence)
+
+    def _count(self, lits, size, delta):
+        self.clauses_of_size[size] += delta
+        counts = self.counts[size]
+        for lit in lits:
+            counts[lit] += delta
+
+    def pick(self, model):
+        size = min(s for s, n in self.clauses_of_size.items() if n > 0)
+        counts = self.counts[size]
+        best, best_score = None, -1
+        for lit, n in counts.items():
+            v = abs(lit)
+            if n > 0 and model[v] is None:
+                f, g = counts.get(v, 0), counts.get(-v, 0)
+                score = (f + g) * 2 ** self.k + f * g
+                if score > best_score:
+                    best, best_score = v, score
+        return best, counts.get(best, 0) >= counts.get(-best, 0)
+
+
+class VSIDS:
+    """Variable state independent decaying sum, for DPLL without learning:
+    activities start at the occurrence counts and are bumped for the
+    variables of a falsified clause at each conflict."""
+
+    def __init__(self, sentence, decay=0.95):
+        self.sentence = sentence
+        self.decay = decay
+        self.increment = 1.0
+        self.activity = defaultdict(float)
+        for lits in sentence.clauses:
+            for lit in lits:
+                self.activity[abs(lit)] += 1.0
+        self.heap = [(-self.activity[v], v) for v in sentence.variables]
+        heapq.heapify(self.heap)
+
+    def assign(self, v, value, model):
+        pass
+
+    def unassign(self, v, model):
+        heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def conflict(self, model):
+        for evaluate, lits in zip(self.sentence.clause_evaluators, self.sentence.clauses):
+            if evaluate(model) is False:
+                for lit in lits:
+                    self._bump(abs(lit))
+                break
+        self.increment /= self.decay
+
+    def _bump(self, v):
+        activity = self.activity
+        activity[v] += self.increment
+        if activity[v] > 1e100:
+            for u in activity:
+                activity[u] *= 1e-100
+            self.increment *= 1e-100
+            self.heap = [(-activity[u], u) for _, u in self.heap]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (-activity[v], v))
+
+    def pick(self, model):
+        heap, activity = self.heap, self.activity
+        while True:
+            act, v = heap[0]
+            if model[v] is None and -act == activity[v]:
+                return v, self.sentence.polarity
+            heapq.heappop(heap)
+
+
+HEURISTICS = {'vsids': VSIDS, 'dlis': DLIS, 'moms': MOMS, 'jw': JeroslowWang}
+
+
+def make_heuristic(name, sentence):
+    """Return the heuristic called name for a CompiledCNF."""
+    if name not in HEURISTICS:
+        raise ValueError('Unknown branching heuristic {}; expected one of {}'.format(
+            name, ', '.join(HEURISTICS)))
+    return HEURISTICS[name](sentence)
@@ -1,69 +1,179 @@
-from KB_algo import PropKB, PropDefiniteKB
+from KB_algo import (PropKB, PropDefiniteKB, tt_entails, tt_entails_compiled, dpll_entails, cdcl_entails,
+                     dpll_satisfiable, cdcl_satisfiable)
+import argparse
+import contextlib
+from functools import partial
 import sys
-from utils import expr
-import re
-
-# ______________________________________________________________________________
-
-infix_or = '||'
-infix_imp = '=>'
-
-def expr_handle_infix(x):
-    return re.sub(r"(?<!<)" + infix_imp, '==>', x.replace(infix_or, '|'))
+from budget import Budget, UNKNOWN, within_budget
+import instrumentation
+from logic_expr import Expr, expr
+from kb_parser import parse, parse_input_file
 
 # ______________________________________________________________________________
 
 # Read input from file
 def extract_input_file(filename):
-    with open(filename, "r") as file:
-        input_text = expr_handle_infix(file.read().upper())
-
-    # Extracting TELL and ASK statements
-    tell_start = input_text.find("TELL")
-    ask_start = input_text.find("ASK")
-
-    tell_section = input_text[tell_start+len("TELL"):ask_start].strip()
-    tell_statements = [statement.strip() for statement in tell_section.split(';') if statement.strip()]
-    ask_statement = input_text[ask_start+len("ASK"):].strip()
-
-
-    KB = tell_statements
-    query = ask_statement
-
-    return (KB, query)
-
-def inference_engine():
-    filename = sys.argv[1]
-    method = sys.argv[2]
+    """Return the parsed TELL sentences and the ASK sentence of an input file."""
+    return parse_input_file(filename)
+
+def split_method(method):
+    """Split a method string such as 'DPLL:vsids' into the method and its
+    variant (None if not given): a branching heuristic for DPLL, or 'bitwise'
+    for the NumPy truth table of TT."""
+    method, _, variant = method.partition(':')
+    if variant and not (method == 'DPLL' or (method == 'TT' and variant == 'bitwise')):
+        raise ValueError("Only DPLL takes a branching heuristic and only TT takes 'bitwise'.")
+    return method, variant or None
+
+KB_TYPES = {'TT': PropKB, 'COUNT': PropKB, 'DPLL': PropKB, 'CDCL': PropKB, 'PORTFOLIO': PropKB, 'CUBE': PropKB,
+            'FC': PropDefiniteKB, 'BC': PropDefiniteKB}
+
+
+def create_kb(method, sentences, cnf='distribute', materialize=False):
+    """Build the kind of KB that method works on and tell it the sentences.
+    cnf picks the CNF conversion ('distribute' or 'tseitin') for general KBs;
+    materialize makes a Horn KB keep its forward-chaining closure."""
+    kb = new_kb(method, cnf, materialize)
+    for kb_sentence in sentences:
+        kb.tell(expr(kb_sentence))
+    return kb
 
-    (kb_sentences, query) = extract_input_file(filename)
 
-    kb = None
-    if method in ['TT', 'DPLL']:
-        kb = PropKB()
-    elif method in ['FC', 'BC']:
-        kb = PropDefiniteKB()
-    else:
+def new_kb(method, cnf='distribute', materialize=False):
+    """Return an empty KB of the kind that method works on."""
+    method = split_method(method)[0]
+    if method not in KB_TYPES:
         raise ValueError("Invalid KB type or method not compatible with KB type.")
-    assert kb is not None
-
-    for kb_sentence in kb_sentences:
-        kb.tell(expr(kb_sentence))
-
+    if KB_TYPES[method] is PropKB:
+        return PropKB(cnf=cnf)
+    return KB_TYPES[method](materialize=materialize)
+
+
+def load_input_file(filename, method, cnf='distribute', cache_dir=None, materialize=False):
+    """Return the KB for method built from an input file, and its query.
+    With a cache_dir, a compiled copy of the KB is reused from there when the
+    file has not changed, and saved there otherwise."""
+    if cache_dir is not None:
+        import kb_cache
+        with instrumentation.phase('cache'):
+            kb = new_kb(method, cnf, materialize)
+            with open(filename, 'rb') as f:
+                path = kb_cache.cache_path(cache_dir, kb_cache.cache_key(f.read(), type(kb), cnf))
+            cached = kb_cache.load_kb(path, kb)
+        if cached is not None:
+            return cached
+    with instrumentation.phase('parse'):
+        (kb_sentences, query) = extract_input_file(filename)
+    with instrumentation.phase('tell'):
+        kb = create_kb(method, kb_sentences, cnf, materialize)
+    if cache_dir is not None:
+        try:
+            kb_cache.save_kb(path, kb, query)
+        except OSError:
+            pass
+    return kb, query
+
+
+def ask(kb, method, query, budget=None):
+    """Ask the query of the KB with the given method, optionally within a Budget.
+    DPLL may name a branching heuristic, as in 'DPLL:vsids'; 'TT:bitwise'
+    checks the truth table 64 models at a time with NumPy."""
+    method, heuristic = split_method(method)
     if (method == 'TT'):
-        result = kb.ask_generator_tt(expr(query))
+        return kb.ask_generator_tt(expr(query), vectorized=heuristic == 'bitwise', budget=budget)
+    elif (method == 'COUNT'):
+        return kb.ask_generator_count(expr(query), budget=budget)
     elif (method == 'BC'):
         assert(isinstance(kb, PropDefiniteKB))
-        result = kb.ask_generator_bc(expr(query))
+        return kb.ask_generator_bc(expr(query), budget=budget)
     elif (method == 'FC'):
         assert(isinstance(kb, PropDefiniteKB))
-        result = kb.ask_generator_fc(expr(query))
+        return kb.ask_generator_fc(expr(query), budget=budget)
     elif (method == 'DPLL'):
-        result = kb.ask_generator_dpll(expr(query))
-
+        if heuristic is not None:
+            return kb.ask_generator_dpll(expr(query), engine='dpll', budget=budget, heuristic=heuristic)
+        return kb.ask_generator_dpll(expr(query), budget=budget)
+    elif (method == 'CDCL'):
+        return kb.ask_generator_dpll(expr(query), engine='cdcl', budget=budget)
+    elif (method == 'PORTFOLIO'):
+        return kb.ask_generator_dpll(expr(query), engine='portfolio', budget=budget)
+    elif (method == 'CUBE'):
+        return kb.ask_generator_dpll(expr(query), engine='cubes', budget=budget)
+    else:
+        raise ValueError("Invalid method")
+
+
+def ask_dimacs(filename, method, query=None, budget=None, decompose=False):
+    """Check a DIMACS CNF file with TT, COUNT, DPLL, CDCL, PORTFOLIO or CUBE: whether
+    it entails the query if one is given, else whether it is satisfiable. Return
+    (answer, details); without a query, COUNT gives the number of models over all
+    the declared variables as details.
+    With decompose, TT, DPLL and CDCL work on independent components (see decompose.py)."""
+    method, heuristic = split_method(method)
+    if method not in ('TT', 'COUNT', 'DPLL', 'CDCL', 'PORTFOLIO', 'CUBE') or (query is None and method == 'TT'):
+        raise ValueError("Method not available for DIMACS input.")
+    from dimacs import read_dimacs
+    with instrumentation.phase('parse'):
+        with open(filename) as f:
+            kb = read_dimacs(f)
+    if query is None:
+        if method == 'COUNT':
+            from counting import count_models
+            count = within_budget(budget, count_models, kb.clauses,
+                                  range(1, len(kb.table) + 1), ())
+            return count if isinstance(count, tuple) else (count > 0, count)
+        if decompose and method in ('DPLL', 'CDCL'):
+            from decompose import satisfiable_parts, split
+            return within_budget(budget, satisfiable_parts, split(kb)[1])
+        if method == 'PORTFOLIO':
+            from portfolio import portfolio_satisfiable as solve
+        elif method == 'CUBE':
+            from cubes import cube_satisfiable as solve
+        elif method == 'CDCL':
+            solve = cdcl_satisfiable
+        else:
+            solve = partial(dpll_satisfiable, heuristic=heuristic)
+        return within_budget(budget, solve, kb)
+    query = parse(query)
+    if method == 'TT':
+        if heuristic == 'bitwise':
+            clauses = [Expr('|', *map(kb.table.decode, lits)) for lits in kb.clauses]
+            return within_budget(budget, tt_entails, Expr('&', *clauses), query, True)
+        if decompose:
+            from decompose import decomposed_tt_entails
+            return within_budget(budget, decomposed_tt_entails, kb, query)
+        return within_budget(budget, tt_entails_compiled, kb, query)
+    if method == 'COUNT':
+        from counting import count_entails
+        return within_budget(budget, count_entails, kb, query, 'distribute')
+    if method == 'PORTFOLIO':
+        from portfolio import portfolio_entails as entails
+    elif method == 'CUBE':
+        from cubes import cube_entails as entails
+    elif method == 'CDCL':
+        entails = cdcl_entails
     else:
-        raise ValueError("Invalid method") 
-    
+        entails = partial(dpll_entails, heuristic=heuristic)
+    if decompose and method in ('DPLL', 'CDCL'):
+        from decompose import decomposed_entails
+        entails = partial(decomposed_entails, entails=entails)
+    return within_budget(budget, entails, kb, query, 'distribute')
+
+
+def format_sat_result(result):
+    """Format a (satisfiable, model) pair from ask_dimacs, or (satisfiable, count) from COUNT."""
+    if result[0] is UNKNOWN:
+        return f'UNKNOWN: {result[1]}'
+    output = 'SATISFIABLE' if result[0] else 'UNSATISFIABLE'
+    if isinstance(result[1], int):
+        output += f': {result[1]}'
+    return output
+
+
+def format_result(method, result):
+    """Format an (entailed, details) pair the way the CLI prints it."""
+    if result[0] is UNKNOWN:
+        return f'UNKNOWN: {result[1]}'
     output = ''
     if result[0]:
         output += 'YES'
@@ -71,12 +181,69 @@ def inference_engine():
         output += 'NO'
 
     #This is required since DPLL will output the partial model when the query is false
-    if output == 'YES' or method == 'DPLL':
+    if output == 'YES' or split_method(method)[0] in ['DPLL', 'CDCL', 'PORTFOLIO', 'CUBE']:
         if result[1]:
             output += f': {str(result[1]).lower()}'
+    return output
+
 
+def add_budget_arguments(parser):
+    """Add the --timeout/--max-* options that describe a Budget."""
+    parser.add_argument('--timeout', type=float, help='seconds allowed for the query')
+    parser.add_argument('--max-decisions', type=int, help='limit on branching decisions / inference steps')
+    parser.add_argument('--max-models', type=int, help='limit on models enumerated by TT')
+    parser.add_argument('--max-learned', type=int, help='limit on learned clause literals / inferred symbols')
+
+
+def budget_limits(args):
+    """Return the Budget keyword arguments given on the command line, if any."""
+    limits = {'timeout': args.timeout, 'max_decisions': args.max_decisions,
+              'max_models': args.max_models, 'max_learned': args.max_learned}
+    return {k: v for k, v in limits.items() if v is not None}
+
+
+def inference_engine():
+    parser = argparse.ArgumentParser(description='Propositional inference engine.')
+    parser.add_argument('filename')
+    parser.add_argument('method')
+    parser.add_argument('--cnf', choices=['distribute', 'tseitin'], default='distribute',
+                        help='CNF conversion for TT/DPLL/CDCL KBs')
+    parser.add_argument('--stats', metavar='FILE',
+                        help="write search counters and phase timings as JSON to FILE ('-' for stderr)")
+    parser.add_argument('--cache-dir',
+                        help='reuse compiled KBs across runs from this directory (default: no cache)')
+    parser.add_argument('--decompose', action='store_true',
+                        help='TT/DPLL/CDCL: solve the query on the independent parts of the KB it touches')
+    parser.add_argument('--materialize', action='store_true',
+                        help='FC/BC: keep the forward-chaining closure on the KB')
+    parser.add_argument('--query', help='for a .cnf file: check entailment of this sentence '
+                                        'instead of satisfiability')
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+    filename, method = args.filename, args.method
+
+    with instrumentation.collect_stats() if args.stats else contextlib.nullcontext() as stats:
+        limits = budget_limits(args)
+        if filename.endswith('.cnf'):
+            budget = Budget(**limits) if limits else None
+            with instrumentation.phase('solve'):
+                result = ask_dimacs(filename, method, args.query, budget, args.decompose)
+            output = format_result(method, result) if args.query else format_sat_result(result)
+        else:
+            kb, query = load_input_file(filename, method, args.cnf, args.cache_dir, args.materialize)
+            if args.decompose and isinstance(kb, PropKB):
+                kb.decompose = True
+            budget = Budget(**limits) if limits else None
+            with instrumentation.phase('solve'):
+                result = ask(kb, method, query, budget)
+            output = format_result(method, result)
     print(output)
+    if args.stats:
+        if args.stats == '-':
+            print(stats.to_json(), file=sys.stderr)
+        else:
+            with open(args.stats, 'w') as f:
+                f.write(stats.to_json(indent=1))
 
 if __name__ == "__main__":
     inference_engine()
-
@@ -0,0 +1,68 @@
+"""Counters and phase timers for the inference loops.
+
+Instrumentation is off unless a collector is installed with collect_stats():
+
+    with collect_stats() as stats:
+        kb.ask_generator_dpll(query)
+    print(stats.to_json())
+
+The inference code reads the module attribute `current` once per call and only
+counts when it is not None, so the disabled cost is a global lookup."""
+
+import contextlib
+import json
+import time
+
+current = None
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class InferenceStats:
+    """Event counters and per-phase wall-clock seconds. Phases may nest, e.g.
+    'cnf' inside 'solve', so their times are not meant to add up. cubes holds
+    a dict of counters for each cube solved by cube-and-conquer."""
+
+    COUNTERS = ('decisions', 'propagations', 'pure_symbols', 'conflicts', 'restarts',
+                'learned_clauses', 'agenda_pops', 'goals', 'index_lookups', 'models')
+    __slots__ = COUNTERS + ('phases', 'cubes')
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.phases = {}
+        self.cubes = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def as_dict(self):
+        d = {'counters': {name: getattr(self, name) for name in self.COUNTERS},
+             'phases': {name: round(t, 6) for name, t in self.phases.items()}}
+        if self.cubes:
+            d['cubes'] = self.cubes
+        return d
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+
+@contextlib.contextmanager
+def collect_stats(stats=None):
+    """Install an InferenceStats as the current collector for the duration of the block."""
+    global current
+    previous, current = current, stats or InferenceStats()
+    try:
+        yield current
+    finally:
+        current = previous
+
+
+def phase(name):
+    """Time a phase on the current collector; does nothing when instrumentation is off."""
+    return current.phase(name) if current is not None else _NO_PHASE
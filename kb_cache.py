@@ -0,0 +1,208 @@
+"""On-disk cache of compiled KBs.
+
+Parsing an input file and converting it to clauses is most of the work of a
+one-shot run on a large KB. A compiled KB is saved under a key made from the
+SHA-256 of the input file, the KB type, the CNF method and the code version:
+the file format plus a digest of this module and of the modules that parse and
+convert sentences, so that a change to any of them never serves a stale KB. The layout is (all
+integers little-endian):
+
+    header    magic b'KBC1', then uint32 flags, symbols, clauses, literals,
+              names bytes, query bytes
+    names     the symbol names, UTF-8, separated by newlines
+    query     the ASK sentence as text, UTF-8
+    offsets   int32[clauses + 1], where clause i is literals[offsets[i]:offsets[i+1]]
+    literals  int32, symbol number + 1, negated for a negative literal
+
+Clauses of a general KB are disjunctions of their literals. With the DEFINITE
+flag a clause is a definite clause: its first literal is the conclusion and the
+rest are the premises. load_kb memory-maps the file and reads the int arrays
+in place. A file that cannot be decoded is deleted and counts as a miss, and
+save_kb keeps the directory under MAX_CACHE_BYTES by deleting the least
+recently used files."""
+
+import functools
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+from logic_expr import Expr, Symbol, intern_expr
+from parser_utils import disjuncts, conjuncts, reserve_aux_symbols
+from kb_parser import parse
+import kb_parser
+import KB_algo
+import logic_expr
+import parser_utils
+
+MAX_CACHE_BYTES = 256 << 20
+MAGIC = b'KBC1'
+DEFINITE = 1
+_HEADER = struct.Struct('<4s6I')
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Return the file format and a digest of the source of this module and
+    of the modules that turn input text into clauses."""
+    h = hashlib.sha256()
+    for path in (__file__, logic_expr.__file__, kb_parser.__file__, parser_utils.__file__, KB_algo.__file__):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return '{}-{}'.format(MAGIC.decode(), h.hexdigest()[:16])
+
+
+def cache_key(data, kb_type, cnf):
+    """Return the cache key of the input bytes data compiled into a kb_type KB."""
+    h = hashlib.sha256(data)
+    h.update('\0{}\0{}\0{}'.format(code_version(), kb_type.__name__, cnf).encode())
+    return h.hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key + '.kbc')
+
+
+def _literal(lit, index):
+    negated = isinstance(lit, Expr) and lit.op == '~'
+    s = lit.args[0] if negated else lit
+    if not isinstance(s, Expr) or s.args:
+        raise ValueError('not a literal: {}'.format(lit))
+    i = index.setdefault(s, len(index)) + 1
+    return -i if negated else i
+
+
+def encode_kb(kb, query):
+    """Return the cache file contents for a KB and its query, or None if the KB
+    has a clause that the format cannot hold."""
+    definite = hasattr(kb, 'premise_index')
+    index = {}
+    offsets = [0]
+    literals = []
+    try:
+        for c in kb.clauses:
+            if definite:
+                if c.op == '==>':
+                    literals.append(_literal(c.args[1], index))
+                    literals.extend(-_literal(p, index) for p in conjuncts(c.args[0]))
+                else:
+                    literals.append(_literal(c, index))
+            else:
+                literals.extend(_literal(lit, index) for lit in disjuncts(c))
+            offsets.append(len(literals))
+    except ValueError:
+        return None
+    names = '\n'.join(s.op for s in index).encode()
+    query_text = ('' if query is None else str(query)).encode()
+    header = _HEADER.pack(MAGIC, DEFINITE if definite else 0, len(index), len(kb.clauses),
+                          len(literals), len(names), len(query_text))
+    strings = names + query_text
+    strings += b'\0' * (-(len(header) + len(strings)) % 4)
+    ints = struct.pack('<{}i'.format(len(offsets) + len(literals)), *offsets, *literals)
+    return header + strings + ints
+
+
+def save_kb(path, kb, query, max_bytes=MAX_CACHE_BYTES):
+    """Write the compiled KB to path atomically, then prune the cache
+    directory to max_bytes. Return False if the KB cannot be cached."""
+    data = encode_kb(kb, query)
+    if data is None:
+        return False
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    prune(directory, max_bytes)
+    return True
+
+
+def prune(cache_dir, max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used cache files until the rest of them take
+    up at most max_bytes. load_kb marks a file used by touching it."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.kbc'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, file in sorted(entries):
+        if total <= max_bytes:
+            break
+        _discard(file)
+        total -= size
+
+
+def _discard(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def load_kb(path, kb):
+    """Fill the empty KB kb from the cache file at path and return (kb, query).
+    Return None if there is no cache file; a file that cannot be decoded is
+    deleted and also gives None, leaving kb partly filled."""
+    try:
+        result = _read_kb(path, kb)
+    except FileNotFoundError:
+        return None
+    except (ValueError, IndexError, UnicodeDecodeError, SyntaxError):
+        _discard(path)
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def _read_kb(path, kb):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        if len(m) < _HEADER.size:
+            raise ValueError('truncated cache file')
+        magic, flags, n_symbols, n_clauses, n_literals, names_len, query_len = _HEADER.unpack_from(m)
+        start = _HEADER.size + names_len + query_len
+        start += -start % 4
+        if magic != MAGIC or len(m) != start + 4 * (n_clauses + 1 + n_literals):
+            raise ValueError('not a {} cache file'.format(MAGIC.decode()))
+        names = bytes(m[_HEADER.size:_HEADER.size + names_len]).decode()
+        query_text = bytes(m[_HEADER.size + names_len:_HEADER.size + names_len + query_len]).decode()
+        symbols = [intern_expr(Symbol(name)) for name in names.split('\n')] if n_symbols else []
+        reserve_aux_symbols(symbols)
+        negations = [intern_expr(Expr('~', s)) for s in symbols]
+        view = memoryview(m)
+        ints = view[start:].cast('i')
+        offsets, literals = ints[:n_clauses + 1], ints[n_clauses + 1:]
+        clauses = []
+        try:
+            for k in range(n_clauses):
+                clause = literals[offsets[k]:offsets[k + 1]].tolist()
+                if not clause:
+                    raise ValueError('empty clause in cache file')
+                if flags & DEFINITE:
+                    head, premises = symbols[clause[0] - 1], [symbols[-i - 1] for i in clause[1:]]
+                    if premises:
+                        body = intern_expr(Expr('&', *premises)) if len(premises) > 1 else premises[0]
+                        head = intern_expr(Expr('==>', body, head))
+                    kb.tell(head)
+                else:
+                    lits = [symbols[i - 1] if i > 0 else negations[-i - 1] for i in clause]
+                    clauses.append(intern_expr(Expr('|', *lits)) if len(lits) > 1 else lits[0])
+            if clauses:
+                kb.add_clauses(clauses)
+        finally:
+            for v in (offsets, literals, ints, view):
+                v.release()
+    return kb, parse(query_text) if query_text else None
@@ -0,0 +1,69 @@
+"""Parameterised generators of KBs for benchmarking the inference methods.
+
+Every generator returns (sentences, query): a list of Exprs to tell and an
+Expr to ask, the same shape that iengine.extract_input_file returns."""
+
+import random
+
+from logic_expr import Expr, Symbol
+
+
+def _lit(symbol, positive):
+    return symbol if positive else Expr('~', symbol)
+
+
+def random_ksat(n_vars, ratio=4.26, k=3, seed=0):
+    """Random k-SAT with round(ratio * n_vars) clauses over n_vars symbols.
+    The query is a random literal, so the answer is usually NO when the KB is
+    satisfiable and always YES when it is not."""
+    rng = random.Random(seed)
+    symbols = [Symbol('X{}'.format(i)) for i in range(n_vars)]
+    clauses = [Expr('|', *[_lit(s, rng.random() < 0.5) for s in rng.sample(symbols, k)])
+               for _ in range(round(ratio * n_vars))]
+    return clauses, _lit(rng.choice(symbols), rng.random() < 0.5)
+
+
+def horn_chain(layers, width, fan_in=2, seed=0):
+    """Layered definite clauses: the width symbols of layer 0 are facts and every
+    symbol of layer i+1 is implied by fan_in random symbols of layer i.
+    The query is a symbol of the last layer, so the answer is YES."""
+    rng = random.Random(seed)
+    layer = [Symbol('L0_{}'.format(j)) for j in range(width)]
+    sentences = list(layer)
+    for i in range(1, layers + 1):
+        nxt = [Symbol('L{}_{}'.format(i, j)) for j in range(width)]
+        for s in nxt:
+            sentences.append(Expr('==>', Expr('&', *rng.sample(layer, min(fan_in, width))), s))
+        layer = nxt
+    return sentences, layer[0]
+
+
+def pigeonhole(holes):
+    """holes + 1 pigeons in holes holes, no two pigeons sharing a hole. The KB is
+    unsatisfiable, so every query is entailed; resolution needs exponential time."""
+    p = [[Symbol('P{}_{}'.format(i, j)) for j in range(holes)] for i in range(holes + 1)]
+    sentences = [Expr('|', *row) if holes > 1 else row[0] for row in p]
+    for j in range(holes):
+        for a in range(holes + 1):
+            for b in range(a + 1, holes + 1):
+                sentences.append(Expr('|', Expr('~', p[a][j]), Expr('~', p[b][j])))
+    return sentences, Symbol('Q')
+
+
+def biconditional_chain(length, width):
+    """X0 is a fact and X(i+1) <=> (X(i) | Y(i)_1 | ... | Y(i)_(width-1)).
+    The query X(length) is entailed."""
+    x = [Symbol('X{}'.format(i)) for i in range(length + 1)]
+    sentences = [x[0]]
+    for i in range(length):
+        ys = [Symbol('Y{}_{}'.format(i, j)) for j in range(1, width)]
+        sentences.append(Expr('<=>', x[i + 1], Expr('|', x[i], *ys) if ys else x[i]))
+    return sentences, x[length]
+
+
+GENERATORS = {
+    'ksat': random_ksat,
+    'horn': horn_chain,
+    'pigeonhole': pigeonhole,
+    'bicond': biconditional_chain,
+}
@@ -0,0 +1,155 @@
+"""Streaming tokenizer and precedence-climbing parser for TELL/ASK files.
+
+Sentences use the operators below, from loosest to tightest binding:
+    <=>   biconditional (left associative)
+    =>    implication (right associative)
+    ||    disjunction
+    &     conjunction
+    ~     negation
+Symbols are upper-cased, as the old eval-based reader did. That reader gave =>
+the precedence of || and made it left associative, so A => B || C was
+(A => B) || C, A => B => C was (A => B) => C and A <=> B => C was
+(A <=> B) => C; here they are A => (B || C), A => (B => C) and A <=> (B => C).
+Chains of & and || become single n-ary Exprs, so long conjunctions do not
+build deep trees."""
+
+import io
+import re
+
+from logic_expr import Expr
+
+_TOKEN = re.compile(r'\s*(<=>|==>|=>|\|\||\||&|~|\(|\)|;|[A-Za-z][A-Za-z0-9_]*)')
+_BINARY = {'<=>': 1, '==>': 2, '=>': 2, '||': 3, '|': 3, '&': 4}
+_CANONICAL = {'<=>': '<=>', '==>': '==>', '=>': '==>', '||': '|', '|': '|', '&': '&'}
+KEYWORDS = ('TELL', 'ASK')
+
+
+def tokenize(stream, chunk_size=1 << 16):
+    """Yield the tokens of a text stream, reading it chunk_size characters at a time.
+    Identifiers are upper-cased; operators are returned as written."""
+    buffer = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        pos, end = 0, len(buffer)
+        while True:
+            m = _TOKEN.match(buffer, pos)
+            if m is None or (m.end() == end and not eof):
+                break
+            token = m.group(1)
+            yield token.upper() if token[0].isalpha() else token
+            pos = m.end()
+        buffer = buffer[pos:]
+        rest = buffer.lstrip()
+        if eof or len(rest) >= 3 and m is None:
+            if rest:
+                raise SyntaxError('Unexpected input near {!r}'.format(rest[:20]))
+            return
+
+
+class Parser:
+    """A precedence-climbing parser over a token iterator with one token of lookahead."""
+
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.symbols = {}
+        self.advance()
+
+    def advance(self):
+        self.token = next(self.tokens, None)
+
+    def expect(self, token):
+        if self.token != token:
+            raise SyntaxError('Expected {!r} but found {!r}'.format(token, self.token))
+        self.advance()
+
+    def parse_sentence(self, min_prec=1):
+        """Parse a sentence whose binary operators all bind at least as tightly as min_prec."""
+        lhs = self.parse_unary()
+        while self.token in _BINARY and _BINARY[self.token] >= min_prec:
+            prec = _BINARY[self.token]
+            op = _CANONICAL[self.token]
+            if op in ('&', '|'):
+                args = []
+                self._collect(op, lhs, args)
+                while self.token in _CANONICAL and _CANONICAL[self.token] == op:
+                    self.advance()
+                    self._collect(op, self.parse_sentence(prec + 1), args)
+                lhs = Expr(op, *args)
+            elif op == '==>':
+                self.advance()
+                lhs = Expr(op, lhs, self.parse_sentence(prec))
+            else:
+                self.advance()
+                lhs = Expr(op, lhs, self.parse_sentence(prec + 1))
+        return lhs
+
+    def parse_unary(self):
+        token = self.token
+        if token == '~':
+            self.advance()
+            return Expr('~', self.parse_unary())
+        if token == '(':
+            self.advance()
+            sentence = self.parse_sentence()
+            self.expect(')')
+            return sentence
+        if token is None or not token[0].isalpha() or token in KEYWORDS:
+            raise SyntaxError('Expected a symbol but found {!r}'.format(token))
+        self.advance()
+        symbol = self.symbols.get(token)
+        if symbol is None:
+            symbol = self.symbols[token] = Expr(token)
+        return symbol
+
+    @staticmethod
+    def _collect(op, arg, args):
+        if arg.op == op:
+            args.extend(arg.args)
+        else:
+            args.append(arg)
+
+
+def parse(text):
+    """Parse a single sentence.
+    >>> parse('a & b & c => d')
+    ((A & B & C) ==> D)
+    """
+    parser = Parser(tokenize(io.StringIO(text)))
+    sentence = parser.parse_sentence()
+    if parser.token is not None:
+        raise SyntaxError('Unexpected {!r} after sentence'.format(parser.token))
+    return sentence
+
+
+def iter_input_file(filename):
+    """Yield ('TELL', sentence) and ('ASK', sentence) pairs from a file, one at a time."""
+    with open(filename, 'r') as file:
+        parser = Parser(tokenize(file))
+        section = None
+        while parser.token is not None:
+            if parser.token in KEYWORDS:
+                section = parser.token
+                parser.advance()
+            elif parser.token == ';':
+                parser.advance()
+            elif section is None:
+                raise SyntaxError('Expected TELL before {!r}'.format(parser.token))
+            else:
+                yield section, parser.parse_sentence()
+                if parser.token not in (None, ';') + KEYWORDS:
+                    raise SyntaxError('Unexpected {!r} after sentence'.format(parser.token))
+
+
+def parse_input_file(filename):
+    """Return the list of TELL sentences and the ASK sentence of a file."""
+    tells, query = [], None
+    for section, sentence in iter_input_file(filename):
+        if section == 'TELL':
+            tells.append(sentence)
+        elif query is None:
+            query = sentence
+        else:
+            raise SyntaxError('More than one ASK sentence in ' + filename)
+    return tells, query
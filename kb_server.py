@@ -0,0 +1,291 @@
+"""A long-running inference server and its client.
+
+    python kb_server.py serve ADDRESS [--kb NAME=FILE ...] [--workers 4] [--timeout 10] [--materialize]
+    python kb_server.py ask ADDRESS FILENAME METHOD
+
+ADDRESS is a Unix socket path or HOST:PORT. The server keeps named KBs in
+memory, with their indexes and solver state, and answers one request per line:
+
+    LOAD name filename         replace KB name with the TELLs and ASK of an input file
+    TELL name sentence         add a sentence to KB name (created if missing)
+    RETRACT name sentence      remove a sentence from KB name
+    ASK name method [sentence] ask the sentence, or the file's ASK, with a method
+    DROP name                  forget KB name
+
+Every request gets one line back: OK, the answer in the iengine output format,
+or ERROR and a message. Connections are served by a pool of worker threads;
+requests on the same KB are serialised by a lock per KB. The threads only
+overlap socket I/O: the engines are pure Python, so because of the GIL ASKs
+on different KBs still run one at a time. Solving is not moved to a process
+pool, since a KB's warm state (indexes, solver, proof table, closure) would
+have to be copied to the worker on every request; PORTFOLIO and CUBE ASKs do
+run their searches in worker processes. The ask command loads
+a file (again only if it changed since it was last loaded) and prints the answer
+exactly as iengine.py would."""
+
+import argparse
+import hashlib
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from budget import Budget
+from iengine import KB_TYPES, split_method, create_kb, ask, format_result, add_budget_arguments, budget_limits
+from kb_parser import parse, parse_input_file
+from KB_algo import IncrementalPropKB
+
+
+class NamedKB:
+    """The sentences told to one named KB and a KB of each kind built from them.
+    KBs are built on first use by a method and kept up to date by tell and
+    retract. CDCL uses an IncrementalPropKB, so its solver stays warm; with
+    materialize, the Horn KB keeps its forward-chaining closure."""
+
+    def __init__(self, sentences=(), query=None, source=None, materialize=False):
+        self.sentences = list(sentences)
+        self.query = query
+        self.source = source
+        self.materialize = materialize
+        self.kbs = {}
+        self.lock = threading.Lock()
+
+    def kb(self, method):
+        method = split_method(method)[0]
+        if method not in KB_TYPES:
+            raise ValueError('Invalid method ' + method)
+        key = 'CDCL' if method == 'CDCL' else KB_TYPES[method]
+        if key not in self.kbs:
+            if method == 'CDCL':
+                kb = IncrementalPropKB()
+                for s in self.sentences:
+                    kb.tell(s)
+            else:
+                kb = create_kb(method, self.sentences, materialize=self.materialize)
+            self.kbs[key] = kb
+        return self.kbs[key]
+
+    def tell(self, sentence):
+        self.sentences.append(sentence)
+        for key, kb in list(self.kbs.items()):
+            try:
+                kb.tell(sentence)
+            except AssertionError:
+                # Not a definite clause: FC and BC fail on this KB from now on.
+                del self.kbs[key]
+
+    def retract(self, sentence):
+        if sentence not in self.sentences:
+            raise ValueError('{} was not told'.format(sentence))
+        self.sentences.remove(sentence)
+        for kb in self.kbs.values():
+            kb.retract(sentence)
+
+
+class KBStore:
+    """The named KBs of a server and the request interpreter."""
+
+    def __init__(self, limits=None, materialize=False):
+        self.kbs = {}
+        self.limits = limits or {}
+        self.materialize = materialize
+        self.lock = threading.Lock()
+
+    def load(self, name, filename):
+        """Load an input file as KB name, unless it is already loaded and unchanged."""
+        source = (os.path.abspath(filename), os.stat(filename).st_mtime_ns)
+        with self.lock:
+            current = self.kbs.get(name)
+            if current is not None and current.source == source:
+                return current
+        tells, query = parse_input_file(filename)
+        named = NamedKB(tells, query, source, self.materialize)
+        with self.lock:
+            self.kbs[name] = named
+        return named
+
+    def get(self, name, create=False):
+        with self.lock:
+            if name not in self.kbs:
+                if not create:
+                    raise KeyError('No KB named ' + name)
+                self.kbs[name] = NamedKB(materialize=self.materialize)
+            return self.kbs[name]
+
+    def handle(self, line):
+        """Run one request line and return the response line."""
+        try:
+            return self._handle(line.split(None, 1))
+        except (ValueError, KeyError, SyntaxError, AssertionError, OSError) as e:
+            message = e.args[0] if isinstance(e, KeyError) and e.args else e
+            return 'ERROR {}: {}'.format(type(e).__name__, message)
+
+    def _handle(self, words):
+        if not words:
+            raise ValueError('Empty request')
+        command, rest = words[0].upper(), words[1] if len(words) > 1 else ''
+        if command == 'DROP':
+            with self.lock:
+                self.kbs.pop(rest.strip(), None)
+            return 'OK'
+        args = rest.split(None, 1)
+        if len(args) < 2:
+            raise ValueError('Usage: {} name ...'.format(command))
+        name, rest = args
+        if command == 'LOAD':
+            self.load(name, rest.strip())
+            return 'OK'
+        if command == 'TELL':
+            named = self.get(name, create=True)
+            with named.lock:
+                named.tell(parse(rest))
+            return 'OK'
+        if command == 'RETRACT':
+            named = self.get(name)
+            with named.lock:
+                named.retract(parse(rest))
+            return 'OK'
+        if command == 'ASK':
+            method, _, sentence = rest.partition(' ')
+            named = self.get(name)
+            with named.lock:
+                query = parse(sentence) if sentence.strip() else named.query
+                if query is None:
+                    raise ValueError('No query given and none loaded')
+                budget = Budget(**self.limits) if self.limits else None
+                return format_result(method, ask(named.kb(method), method, query, budget))
+        raise ValueError('Unknown command ' + command)
+
+
+class LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode().strip()
+            if not line:
+                continue
+            self.wfile.write((self.server.store.handle(line) + '\n').encode())
+            self.wfile.flush()
+
+
+class PooledMixIn:
+    """Serve each connection on a thread from a fixed-size pool, like
+    socketserver.ThreadingMixIn but without a thread per connection. The
+    threads share the GIL, so they overlap I/O, not solving."""
+
+    workers = 4
+
+    def process_request(self, request, client_address):
+        if not hasattr(self, 'pool'):
+            self.pool = ThreadPoolExecutor(self.workers)
+        self.pool.submit(self._process_pooled, request, client_address)
+
+    def _process_pooled(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if hasattr(self, 'pool'):
+            self.pool.shutdown()
+
+
+class TCPServer(PooledMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class UnixServer(PooledMixIn, socketserver.UnixStreamServer):
+        pass
+
+
+def parse_address(address):
+    """Return (family, address) for a Unix socket path or a HOST:PORT string."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return socket.AF_INET, (host or 'localhost', int(port))
+    return socket.AF_UNIX, address
+
+
+def make_server(address, store, workers=4):
+    """Bind a server for the KBStore to address; call serve_forever() on it."""
+    family, address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(address):
+            os.unlink(address)
+        server = UnixServer(address, LineHandler, bind_and_activate=False)
+    else:
+        server = TCPServer(address, LineHandler, bind_and_activate=False)
+    server.store = store
+    server.workers = workers
+    try:
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    return server
+
+
+def request(address, lines):
+    """Send request lines to a server and return the response lines."""
+    family, address = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.connect(address)
+        with sock.makefile('rw', encoding='utf-8', newline='\n') as f:
+            responses = []
+            for line in lines:
+                f.write(line + '\n')
+                f.flush()
+                responses.append(f.readline().rstrip('\n'))
+            return responses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve KBs over a socket, or ask a running server.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='run the server')
+    serve.add_argument('address', help='Unix socket path or HOST:PORT')
+    serve.add_argument('--kb', action='append', default=[], metavar='NAME=FILE',
+                       help='load an input file as a named KB at startup')
+    serve.add_argument('--workers', type=int, default=4, help='connections served at once (their ASKs still share one core)')
+    serve.add_argument('--materialize', action='store_true',
+                       help='keep the forward-chaining closure of each Horn KB between requests')
+    add_budget_arguments(serve)
+    client = commands.add_parser('ask', help='ask the query of an input file, printing what iengine.py prints')
+    client.add_argument('address')
+    client.add_argument('filename')
+    client.add_argument('method')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        store = KBStore(budget_limits(args), args.materialize)
+        for spec in args.kb:
+            name, _, filename = spec.partition('=')
+            store.load(name, filename)
+        with make_server(args.address, store, args.workers) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    filename = os.path.abspath(args.filename)
+    name = 'file:' + hashlib.sha1(filename.encode()).hexdigest()[:16]
+    loaded, answer = request(args.address, ['LOAD {} {}'.format(name, filename),
+                                            'ASK {} {}'.format(name, args.method)])
+    for response in (loaded, answer):
+        if response.startswith('ERROR'):
+            print(response, file=sys.stderr)
+            return 1
+    print(answer)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
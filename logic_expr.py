@@ -0,0 +1,280 @@
+"""Logical expressions: the Expr class, Symbols and the expr() parser.
+
+This is the part of utils that the inference engine needs. It imports only the
+standard library, so iengine.py can start without loading NumPy; utils
+re-exports everything here."""
+
+import collections
+import weakref
+
+
+# See https://docs.python.org/3/reference/expressions.html#operator-precedence
+# See https://docs.python.org/3/reference/datamodel.html#special-method-names
+
+class Expr:
+    """A mathematical expression with an operator and 0 or more arguments.
+    op is a str like '+' or 'sin'; args are Expressions.
+    Expr('x') or Symbol('x') creates a symbol (a nullary Expr).
+    Expr('-', x) creates a unary; Expr('+', x, 1) creates a binary.
+    Exprs are treated as immutable: the hash is computed once and cached.
+    Use intern_expr to get the shared, hash-consed copy of an Expr."""
+
+    __slots__ = ('op', 'args', '_hash', '_interned', '__weakref__')
+
+    def __init__(self, op, *args):
+        self.op = str(op)
+        self.args = args
+        self._hash = None
+        self._interned = False
+
+    # Operator overloads
+    def __neg__(self):
+        return Expr('-', self)
+
+    def __pos__(self):
+        return Expr('+', self)
+
+    def __invert__(self):
+        return Expr('~', self)
+
+    def __add__(self, rhs):
+        return Expr('+', self, rhs)
+
+    def __sub__(self, rhs):
+        return Expr('-', self, rhs)
+
+    def __mul__(self, rhs):
+        return Expr('*', self, rhs)
+
+    def __pow__(self, rhs):
+        return Expr('**', self, rhs)
+
+    def __mod__(self, rhs):
+        return Expr('%', self, rhs)
+
+    def __and__(self, rhs):
+        return Expr('&', self, rhs)
+
+    def __xor__(self, rhs):
+        return Expr('^', self, rhs)
+
+    def __rshift__(self, rhs):
+        return Expr('>>', self, rhs)
+
+    def __lshift__(self, rhs):
+        return Expr('<<', self, rhs)
+
+    def __truediv__(self, rhs):
+        return Expr('/', self, rhs)
+
+    def __floordiv__(self, rhs):
+        return Expr('//', self, rhs)
+
+    def __matmul__(self, rhs):
+        return Expr('@', self, rhs)
+
+    def __or__(self, rhs):
+        """Allow both P | Q, and P |'==>'| Q."""
+        if isinstance(rhs, Expression):
+            return Expr('|', self, rhs)
+        else:
+            return PartialExpr(rhs, self)
+
+    # Reverse operator overloads
+    def __radd__(self, lhs):
+        return Expr('+', lhs, self)
+
+    def __rsub__(self, lhs):
+        return Expr('-', lhs, self)
+
+    def __rmul__(self, lhs):
+        return Expr('*', lhs, self)
+
+    def __rdiv__(self, lhs):
+        return Expr('/', lhs, self)
+
+    def __rpow__(self, lhs):
+        return Expr('**', lhs, self)
+
+    def __rmod__(self, lhs):
+        return Expr('%', lhs, self)
+
+    def __rand__(self, lhs):
+        return Expr('&', lhs, self)
+
+    def __rxor__(self, lhs):
+        return Expr('^', lhs, self)
+
+    def __ror__(self, lhs):
+        return Expr('|', lhs, self)
+
+    def __rrshift__(self, lhs):
+        return Expr('>>', lhs, self)
+
+    def __rlshift__(self, lhs):
+        return Expr('<<', lhs, self)
+
+    def __rtruediv__(self, lhs):
+        return Expr('/', lhs, self)
+
+    def __rfloordiv__(self, lhs):
+        return Expr('//', lhs, self)
+
+    def __rmatmul__(self, lhs):
+        return Expr('@', lhs, self)
+
+    def __call__(self, *args):
+        """Call: if 'f' is a Symbol, then f(0) == Expr('f', 0)."""
+        if self.args:
+            raise ValueError('Can only do a call for a Symbol, not an Expr')
+        else:
+            return Expr(self.op, *args)
+
+    # Equality and repr
+    def __eq__(self, other):
+        """x == y' evaluates to True or False; does not build an Expr.
+        Two interned Exprs are equal only if they are the same object."""
+        if self is other:
+            return True
+        if not isinstance(other, Expr) or (self._interned and other._interned):
+            return False
+        return self.op == other.op and self.args == other.args
+
+    def __lt__(self, other):
+        return isinstance(other, Expr) and str(self) < str(other)
+
+    def __hash__(self):
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(self.op) ^ hash(self.args)
+        return h
+
+    def __reduce__(self):
+        return (_unpickle_expr, (self.op, self.args, self._interned))
+
+    def __repr__(self):
+        op = self.op
+        args = [str(arg) for arg in self.args]
+        if op.isidentifier():  # f(x) or f(x, y)
+            return '{}({})'.format(op, ', '.join(args)) if args else op
+        elif len(args) == 1:  # -x or -(x + 1)
+            return op + args[0]
+        else:  # (x - y)
+            opp = (' ' + op + ' ')
+            return '(' + opp.join(args) + ')'
+
+
+# An 'Expression' is either an Expr or a Number.
+# Symbol is not an explicit type; it is any Expr with 0 args.
+
+
+Number = (int, float, complex)
+Expression = (Expr, Number)
+
+
+def Symbol(name):
+    """A Symbol is just an Expr with no args."""
+    return Expr(name)
+
+
+def symbols(names):
+    """Return a tuple of Symbols; names is a comma/whitespace delimited str."""
+    return tuple(Symbol(name) for name in names.replace(',', ' ').split())
+
+
+_intern_table = weakref.WeakValueDictionary()
+
+
+def intern_expr(x):
+    """Return the canonical copy of the Expression x from the global intern table.
+    Structurally equal interned Exprs are the same object, so they compare by
+    identity and share their cached hash. Numbers are returned unchanged.
+    The table holds its Exprs weakly: an entry goes when nothing else uses it.
+    >>> intern_expr(expr('A & B')) is intern_expr(expr('A & B'))
+    True
+    """
+    if not isinstance(x, Expr) or x._interned:
+        return x
+    args = tuple(intern_expr(arg) for arg in x.args)
+    key = (x.op, args)
+    canonical = _intern_table.get(key)
+    if canonical is None:
+        if all(a is b for a, b in zip(args, x.args)):
+            canonical = x
+        else:
+            canonical = Expr(x.op, *args)
+        canonical._interned = True
+        _intern_table[key] = canonical
+    return canonical
+
+
+def _unpickle_expr(op, args, interned):
+    x = Expr(op, *args)
+    return intern_expr(x) if interned else x
+
+
+def subexpressions(x):
+    """Yield the subexpressions of an Expression (including x itself)."""
+    yield x
+    if isinstance(x, Expr):
+        for arg in x.args:
+            yield from subexpressions(arg)
+
+
+def arity(expression):
+    """The number of sub-expressions in this expression."""
+    if isinstance(expression, Expr):
+        return len(expression.args)
+    else:  # expression is a number
+        return 0
+
+
+# For operators that are not defined in Python, we allow new InfixOps:
+
+
+class PartialExpr:
+    """Given 'P |'==>'| Q, first form PartialExpr('==>', P), then combine with Q."""
+
+    def __init__(self, op, lhs):
+        self.op, self.lhs = op, lhs
+
+    def __or__(self, rhs):
+        return Expr(self.op, self.lhs, rhs)
+
+    def __repr__(self):
+        return "PartialExpr('{}', {})".format(self.op, self.lhs)
+
+
+def expr(x):
+    """Shortcut to create an Expression. x is a str in which:
+    - identifiers are automatically defined as Symbols.
+    - ==> is treated as an infix |'==>'|, as are <== and <=>.
+    If x is already an Expression, it is returned unchanged. Example:
+    >>> expr('P & Q ==> Q')
+    ((P & Q) ==> Q)
+    """
+    return eval(expr_handle_infix_ops(x), defaultkeydict(Symbol)) if isinstance(x, str) else x
+
+
+infix_ops = '==> <== <=>'.split()
+
+
+def expr_handle_infix_ops(x):
+    """Given a str, return a new str with ==> replaced by |'==>'|, etc.
+    >>> expr_handle_infix_ops('P ==> Q')
+    "P |'==>'| Q"
+    """
+    for op in infix_ops:
+        x = x.replace(op, '|' + repr(op) + '|')
+    return x
+
+
+class defaultkeydict(collections.defaultdict):
+    """Like defaultdict, but the default_factory is a function of the key.
+    >>> d = defaultkeydict(len); d['four']
+    4
+    """
+
+    def __missing__(self, key):
+        self[key] = result = self.default_factory(key)
+        return result
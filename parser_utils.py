@@ -1,4 +1,6 @@
-from utils import expr, Expr, first
+import itertools
+
+from logic_expr import expr, Expr
 
 # Parser utils to convert to Conjunctive Normal Form (CNF)
 
@@ -7,16 +9,21 @@ def is_symbol(s):
     """
     return isinstance(s, str) and s[:1].isalpha()
 
-def to_cnf(s):
+def to_cnf(s, method='distribute'):
     """
     Convert a propositional logical sentence to conjunctive normal form.
     That is, to the form ((A | ~B | ...) & (B | C | ...) & ...)
+    method='distribute' gives an equivalent CNF, which can be exponentially
+    large; method='tseitin' gives a linear-size, equisatisfiable CNF over
+    extra auxiliary symbols (see tseitin_cnf).
     >>> to_cnf('~(B | C)')
     (~B & ~C)
     """
     s = expr(s)
     if isinstance(s, str):
         s = expr(s)
+    if method == 'tseitin':
+        return tseitin_cnf(s)
     s = eliminate_implications(s)
     s = move_not_inwards(s)
     return distribute_and_over_or(s)
@@ -81,7 +88,7 @@ def distribute_and_over_or(s):
             return False
         if len(s.args) == 1:
             return distribute_and_over_or(s.args[0])
-        conj = first(arg for arg in s.args if arg.op == '&')
+        conj = next((arg for arg in s.args if arg.op == '&'), None)
         if not conj:
             return s
         others = [a for a in s.args if a is not conj]
@@ -94,6 +101,84 @@ def distribute_and_over_or(s):
         return s
 
 
+AUX_PREFIX = 'Tseitin_'
+_aux_counter = itertools.count(1)
+
+
+def is_aux_symbol(s):
+    """Is s an auxiliary symbol introduced by tseitin_cnf? Parsed input is
+    upper-cased, so it can never spell one of these names."""
+    return isinstance(s, Expr) and s.op.startswith(AUX_PREFIX) and not s.args
+
+
+def reserve_aux_symbols(symbols):
+    """Make sure tseitin_cnf does not mint again the name of any aux symbol in
+    symbols, such as those of a KB that another process compiled."""
+    global _aux_counter
+    top = max((int(s.op[len(AUX_PREFIX):]) for s in symbols
+               if is_aux_symbol(s) and s.op[len(AUX_PREFIX):].isdigit()), default=0)
+    _aux_counter = itertools.count(max(next(_aux_counter), top + 1))
+
+
+def tseitin_cnf(s):
+    """Convert a sentence to CNF with the Tseitin encoding.
+    Every compound sub-formula f that is not at the top of a conjunction or
+    clause gets a fresh symbol x and the clauses of x <=> f, so the result
+    has size linear in s. The CNF is satisfiable iff s is, and every model of
+    s extends to exactly one model of the CNF, so model counts are preserved.
+    >>> tseitin_cnf(expr('A & (B | ~C)'))
+    (A & (B | ~C))
+    """
+    if s in (True, False):
+        return s
+    clauses = []
+    names = {}
+
+    def negate(lit):
+        return lit.args[0] if lit.op == '~' else Expr('~', lit)
+
+    def literal(f):
+        """Return a literal equivalent to f, defining a new symbol if needed."""
+        if is_symbol(f.op):
+            return f
+        if f.op == '~':
+            return negate(literal(f.args[0]))
+        if f in names:
+            return names[f]
+        op, args = f.op, f.args
+        if op == '==>':
+            op, args = '|', (Expr('~', args[0]), args[1])
+        elif op == '<==':
+            op, args = '|', (args[0], Expr('~', args[1]))
+        lits = [literal(arg) for arg in args]
+        x = Expr(AUX_PREFIX + str(next(_aux_counter)))
+        nx = Expr('~', x)
+        if op == '&':
+            clauses.extend(associate('|', [nx, a]) for a in lits)
+            clauses.append(associate('|', [x] + [negate(a) for a in lits]))
+        elif op == '|':
+            clauses.append(associate('|', [nx] + lits))
+            clauses.extend(associate('|', [x, negate(a)]) for a in lits)
+        elif op in ('<=>', '^'):
+            a, b = lits
+            if op == '^':
+                b = negate(b)
+            clauses.extend([associate('|', [nx, negate(a), b]), associate('|', [nx, a, negate(b)]),
+                            associate('|', [x, a, b]), associate('|', [x, negate(a), negate(b)])])
+        else:
+            raise ValueError('Illegal operator in logic expression' + str(f))
+        names[f] = x
+        return x
+
+    for conjunct in conjuncts(s):
+        if conjunct.op == '==>':
+            conjunct = Expr('|', Expr('~', conjunct.args[0]), conjunct.args[1])
+        elif conjunct.op == '<==':
+            conjunct = Expr('|', conjunct.args[0], Expr('~', conjunct.args[1]))
+        clauses.append(associate('|', [literal(d) for d in disjuncts(conjunct)]))
+    return associate('&', clauses)
+
+
 def associate(op, args):
     """Given an associative op, return an expression with the same
     meaning as Expr(op, *args), but flattened -- that is, with nested
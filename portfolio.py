@@ -0,0 +1,187 @@
+"""Portfolio solving: several differently configured DPLL and CDCL searches on
+the same clauses, each in its own process. The first definite answer wins and
+the other processes are terminated.
+
+A configuration is a dict. 'engine' is 'cdcl' or 'dpll'; 'polarity' is the
+value tried first; 'seed' randomises the branching order (DPLL) or breaks
+activity ties and drives random decisions (CDCL, with 'random_freq');
+'order' is 'input' or 'occurrences' for DPLL; 'restart_base' and 'var_decay'
+are passed to CDCLSolver. With share=True the CDCL workers pass learnt
+clauses of up to share_length literals to each other."""
+
+import multiprocessing
+import os
+import queue
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from budget import Budget, BudgetExceeded, UNKNOWN
+from cdcl import CDCLSolver
+from KB_algo import (CompiledKB, CompiledCNF, Trail, DPLL, to_cnf, hide_aux,
+                     record_solver_stats, solver_model)
+from logic_expr import expr
+import instrumentation
+
+PORTFOLIO = [
+    {'engine': 'cdcl'},
+    {'engine': 'cdcl', 'polarity': True, 'seed': 1},
+    {'engine': 'dpll', 'order': 'occurrences'},
+    {'engine': 'cdcl', 'seed': 2, 'restart_base': 50, 'var_decay': 0.85},
+    {'engine': 'cdcl', 'seed': 3, 'polarity': True, 'random_freq': 0.02},
+    {'engine': 'dpll', 'seed': 4, 'polarity': False},
+    {'engine': 'cdcl', 'seed': 5, 'restart_base': 300, 'var_decay': 0.99},
+    {'engine': 'dpll', 'seed': 6},
+]
+
+
+def default_portfolio(workers=None):
+    """Return workers configurations (default: one per CPU): the PORTFOLIO list,
+    followed by seeded CDCL variants if more are wanted."""
+    workers = workers or os.cpu_count() or 1
+    configs = PORTFOLIO[:workers]
+    for seed in range(len(configs), workers):
+        configs.append({'engine': 'cdcl', 'seed': seed, 'polarity': seed % 2 == 0,
+                        'random_freq': 0.01})
+    return configs
+
+
+class ClauseExchange:
+    """A CDCLSolver's link to the other portfolio workers: export sends short
+    learnt clauses to their inboxes, collect drains this worker's inbox."""
+
+    def __init__(self, inbox, outboxes, max_length):
+        self.inbox = inbox
+        self.outboxes = outboxes
+        self.max_length = max_length
+
+    def export(self, lits):
+        if len(lits) <= self.max_length:
+            lits = tuple(lits)
+            for box in self.outboxes:
+                box.put(lits)
+
+    def collect(self):
+        clauses = []
+        while True:
+            try:
+                clauses.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return clauses
+
+
+def solve_config(config, kb, extra=(), budget=None, exchange=None):
+    """Run one configuration on the clauses of the CompiledKB kb plus extra.
+    Return (satisfiable, model, stats) with the model as a {variable: value} dict."""
+    if config.get('engine', 'cdcl') == 'dpll':
+        compiled = CompiledCNF(kb, extra)
+        compiled.polarity = config.get('polarity', True)
+        if config.get('order') == 'occurrences':
+            counts = Counter(abs(lit) for lits in compiled.clauses for lit in lits)
+            compiled.variables.sort(key=lambda v: -counts[v])
+        elif config.get('seed') is not None:
+            random.Random(config['seed']).shuffle(compiled.variables)
+        trail = Trail(len(kb.table) + 1)
+        if not DPLL(compiled, trail, budget):
+            return False, None, {}
+        return True, {v: trail.values[v] for v in compiled.variables if trail.values[v] is not None}, {}
+    solver = CDCLSolver(restart_base=config.get('restart_base', 100),
+                        var_decay=config.get('var_decay', 0.95), budget=budget,
+                        polarity=config.get('polarity', False), seed=config.get('seed'),
+                        random_freq=config.get('random_freq', 0.0))
+    solver.exchange = exchange
+    for lits in kb.clauses + list(extra):
+        solver.add_clause(lits)
+    satisfiable = solver.solve()
+    return satisfiable, solver.model if satisfiable else None, dict(solver.stats)
+
+
+def _worker(index, config, kb, extra, limits, inboxes, results):
+    exchange = None
+    if inboxes is not None and config.get('engine', 'cdcl') == 'cdcl':
+        outboxes = [box for i, box in enumerate(inboxes) if i != index and box is not None]
+        for box in outboxes:
+            box.cancel_join_thread()
+        exchange = ClauseExchange(inboxes[index], outboxes, config.get('share_length', 8))
+    budget = Budget(**limits) if limits else None
+    try:
+        results.put((index,) + solve_config(config, kb, extra, budget, exchange))
+    except BudgetExceeded as e:
+        results.put((index, UNKNOWN, e.reason, {}))
+    except Exception as e:
+        results.put((index, 'error', '{}: {}'.format(type(e).__name__, e), {}))
+
+
+def run_portfolio(kb, extra=(), budget=None, configs=None, share=False):
+    """Race the configurations on the clauses of the CompiledKB kb plus extra.
+    Return (satisfiable, model, winner) where winner is the index of the
+    configuration that answered, or raise BudgetExceeded if none did in time.
+    Each worker gets its own Budget with the limits of budget; the wall clock
+    of budget itself is checked here."""
+    configs = configs or default_portfolio()
+    if len(configs) == 1:
+        satisfiable, model, stats = solve_config(configs[0], kb, extra, budget)
+        return satisfiable, model, 0
+    limits = {} if budget is None else budget.limits()
+    deadline = budget.deadline if budget is not None else None
+    results = multiprocessing.Queue()
+    inboxes = None
+    if share:
+        inboxes = [multiprocessing.Queue() if config.get('engine', 'cdcl') == 'cdcl' else None
+                   for config in configs]
+    workers = [multiprocessing.Process(target=_worker, daemon=True,
+                                       args=(i, config, kb, extra, limits, inboxes, results))
+               for i, config in enumerate(configs)]
+    for worker in workers:
+        worker.start()
+    errors = []
+    reason = 'timeout'
+    try:
+        for _ in workers:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                index, satisfiable, model, stats = results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if satisfiable == 'error':
+                errors.append(model)
+            elif satisfiable is UNKNOWN:
+                reason = model
+            else:
+                if stats:
+                    record_solver_stats(SimpleNamespace(stats=stats))
+                return satisfiable, model, index
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        for worker in workers:
+            worker.join()
+    if errors and len(errors) == len(workers):
+        raise RuntimeError('all portfolio workers failed: ' + errors[0])
+    if budget is None:
+        raise RuntimeError('portfolio workers stopped without an answer')
+    budget.exceeded = reason
+    raise BudgetExceeded(reason)
+
+
+def portfolio_entails(KB, q, cnf='distribute', budget=None, configs=None, share=False):
+    """Check if KB (a CompiledKB or a list of CNF clauses) entails q by racing
+    the configurations. Returns the same (entailed, model) pair as dpll_entails."""
+    KB = KB if isinstance(KB, CompiledKB) else CompiledKB(KB)
+    with instrumentation.phase('cnf'):
+        negated = KB.encode_cnf(to_cnf(~expr(q), cnf))
+    satisfiable, model, winner = run_portfolio(KB, negated, budget, configs, share)
+    if satisfiable:
+        return False, hide_aux(solver_model(KB, model, KB.variables(negated)))
+    return True, None
+
+
+def portfolio_satisfiable(KB, budget=None, configs=None, share=False):
+    """Is the CompiledKB KB satisfiable? Returns (satisfiable, model) from the first
+    configuration to finish."""
+    satisfiable, model, winner = run_portfolio(KB, (), budget, configs, share)
+    if satisfiable:
+        return True, solver_model(KB, model, KB.variables())
+    return False, None
@@ -1,68 +1,107 @@
-import csv, os
-from iengine import extract_input_file
-from KB_algo import PropKB, PropDefiniteKB
-from utils import expr
+import argparse, csv, os, signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from budget import Budget
+from iengine import (extract_input_file, split_method, create_kb, ask, format_result, add_budget_arguments,
+                     budget_limits)
 
-""""This file is used for running the batch of test files in 1 go."""
+""""This file is used for running the batch of test files in 1 go.
+Each file is parsed once; the (file x method) jobs then build their KB and
+run on a process pool, and the rows are written to the CSV in a fixed order
+as soon as they are complete."""
 
 METHODS = ['TT', 'DPLL', 'BC', 'FC']
 
-content = ''
-content = 'No; test case;' + '; '.join(METHODS) + '\n'
-
-for root, dirs, files in os.walk('tests/'):
-    for index, file in enumerate(files):
-        line = str(index + 1) + '; '
-        if file.endswith('.txt'):
-            file_path = os.path.join(root, file)
-            line += file_path + '; '
-            tells, ask = extract_input_file(file_path)
-            result = []
-            for method in METHODS:
-                kb = None               
-                if ('generic' in file_path.lower()) and (method not in ['TT', 'DPLL']):
-                        result.append('N/A')
-                        continue
-                
-                if method in ['TT', 'DPLL']:
-                    kb = PropKB()
-                elif method in ['FC', 'BC']:
-                    kb = PropDefiniteKB()
-                else:
-                    raise ValueError("Invalid KB type or method not compatible with KB type.")
-                for tell in tells:
-                    kb.tell(expr(tell))
-
-                if (method == 'TT'):
-                    entailment = kb.ask_generator_tt(expr(ask))
-                elif (method == 'BC'):
-                    assert(isinstance(kb, PropDefiniteKB))
-                    entailment = kb.ask_generator_bc(expr(ask))
-                elif (method == 'FC'):
-                    assert(isinstance(kb, PropDefiniteKB))
-                    entailment = kb.ask_generator_fc(expr(ask))
-                elif (method == 'DPLL'):
-                    entailment = kb.ask_generator_dpll(expr(ask))
-                else:
-                    raise ValueError("Invalid method")
-
-                result.append('YES' if entailment[0] else 'NO')
-                if result[-1] == 'YES' or method == 'DPLL':
-                    if entailment[1]:
-                        result[-1] += f': {str(entailment[1]).lower()}'
-            line += ';'.join(result) + '\n'
-        
-        content += line
-
-# Split the content into rows
-rows = content.split('\n')
-
-# Open the CSV file for writing
-with open('test_results.csv', 'w', newline='') as f:
-    # Create a CSV writer object with a semicolon delimiter
-    writer = csv.writer(f, delimiter=';')
-    
-    # Iterate over the rows
-    for row in rows:
-        # Strip leading and trailing whitespace from the row and split each row into columns
-        writer.writerow(row.strip().split(';'))
\ No newline at end of file
+# Extra seconds a job may run past its budget timeout before the hard timer stops it,
+# e.g. while converting a large KB to CNF where the budget is not checked.
+HARD_TIMEOUT_GRACE = 1.0
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def run_job(tells, method, query, limits=None):
+    """Build the KB for method from the parsed tells, run the method on it and
+    return the formatted result cell. limits are the Budget keyword arguments;
+    the Budget is created once the KB is built. A timeout is also backed by an
+    interval timer where the platform has one (not on Windows), started
+    before the KB is built."""
+    limits = limits or {}
+    timeout = limits.get('timeout')
+    use_timer = timeout and hasattr(signal, 'setitimer')
+    if use_timer:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout + HARD_TIMEOUT_GRACE)
+    try:
+        kb = create_kb(method, tells)
+        budget = Budget(**limits) if limits else None
+        return format_result(method, ask(kb, method, query, budget))
+    except JobTimeout:
+        return 'TIMEOUT'
+    except RecursionError:
+        return 'ERROR: recursion limit'
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def iter_test_files(root):
+    """Yield (number, path) for the .txt files under root in a fixed order.
+    Numbering restarts at 1 in each directory."""
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        for index, file in enumerate(sorted(f for f in files if f.endswith('.txt'))):
+            yield index + 1, os.path.join(directory, file)
+
+
+def submit_file(executor, file_path, methods, limits):
+    """Parse a file once and submit its jobs.
+    Returns one future (or a finished cell string) per method."""
+    tells, query = extract_input_file(file_path)
+    jobs = []
+    for method in methods:
+        if ('generic' in file_path.lower()) and (split_method(method)[0] not in ['TT', 'DPLL']):
+            jobs.append('N/A')
+            continue
+        jobs.append(executor.submit(run_job, tells, method, query, limits))
+    return jobs
+
+
+def run_batch(root='tests/', output='test_results.csv', methods=METHODS, workers=None, limits=None):
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(('No; test case;' + '; '.join(methods)).split(';'))
+        # Only a few files per worker are parsed and queued ahead of the row being written.
+        window = deque()
+        files = iter_test_files(root)
+        while True:
+            while len(window) < 4 * workers:
+                number, path = next(files, (None, None))
+                if path is None:
+                    break
+                window.append((number, path, submit_file(executor, path, methods, limits)))
+            if not window:
+                break
+            number, path, jobs = window.popleft()
+            result = [job if isinstance(job, str) else job.result() for job in jobs]
+            line = str(number) + '; ' + path + '; ' + ';'.join(result)
+            writer.writerow(line.split(';'))
+            f.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run every test file through the inference methods.')
+    parser.add_argument('root', nargs='?', default='tests/')
+    parser.add_argument('--output', default='test_results.csv')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--methods', nargs='+', default=METHODS,
+                        help="methods to run, such as TT:bitwise or DPLL:vsids (default: %(default)s)")
+    add_budget_arguments(parser)
+    args = parser.parse_args()
+    run_batch(args.root, args.output, args.methods, args.workers, budget_limits(args))
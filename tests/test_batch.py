@@ -0,0 +1,18 @@
+import csv
+import time
+
+import test_runner
+
+
+def test_timeout_covers_cnf_conversion(tmp_path):
+    directory = tmp_path / 'generic'
+    directory.mkdir()
+    disjunction = ' || '.join('(a{0} & b{0})'.format(i) for i in range(22))
+    (directory / 'test1.txt').write_text('TELL\n{};\nASK\na0\n'.format(disjunction))
+    output = tmp_path / 'results.csv'
+    started = time.monotonic()
+    test_runner.run_batch(str(tmp_path), str(output), ['TT', 'DPLL'], workers=1, limits={'timeout': 0.5})
+    assert time.monotonic() - started < 10
+    with open(output, newline='') as f:
+        rows = list(csv.reader(f, delimiter=';'))
+    assert [cell.strip() for cell in rows[1][2:]] == ['TIMEOUT', 'TIMEOUT']
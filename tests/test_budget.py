@@ -0,0 +1,40 @@
+import pytest
+
+from budget import Budget, UNKNOWN
+from iengine import ask, create_kb, format_result, format_sat_result
+
+
+def test_limits_rebuild_an_equal_budget():
+    assert Budget().limits() == {}
+    limits = {'timeout': 2.5, 'max_decisions': 100, 'max_learned': 7}
+    copy = Budget(**Budget(**limits).limits())
+    assert (copy.timeout, copy.max_decisions, copy.max_models, copy.max_learned) == (2.5, 100, None, 7)
+
+
+HORN = ['P2 ==> P3', 'P3 ==> P1', 'C ==> E', 'B & E ==> F', 'F & G ==> H', 'P1 ==> D',
+        'P1 & P3 ==> C', 'A', 'B', 'P2']
+GENERAL = ['A | B', 'A | ~B', '~A | B', '~A | ~B | C', 'C | D', '~C | ~D | E']
+
+
+@pytest.mark.parametrize('method, sentences, limit', [
+    ('TT', GENERAL, 'max_models'),
+    ('TT:bitwise', GENERAL, 'max_models'),
+    ('DPLL', GENERAL, 'max_decisions'),
+    ('DPLL:vsids', GENERAL, 'max_decisions'),
+    ('CDCL', GENERAL, 'max_decisions'),
+    ('COUNT', GENERAL, 'max_decisions'),
+    ('BC', HORN, 'max_decisions'),
+    ('FC', HORN, 'max_decisions'),
+])
+def test_tiny_budget_gives_unknown(method, sentences, limit):
+    for query in ('C', 'E') if sentences is GENERAL else ('D', 'H'):
+        result = ask(create_kb(method, sentences), method, query, Budget(**{limit: 0}))
+        assert result[0] is UNKNOWN and result[1]['exceeded'] == limit, query
+        assert ask(create_kb(method, sentences), method, query)[0] is not UNKNOWN
+
+
+def test_format_unknown():
+    report = {'exceeded': 'max_decisions', 'decisions': 1}
+    assert format_result('DPLL', (UNKNOWN, report)) == 'UNKNOWN: ' + str(report)
+    assert format_sat_result((UNKNOWN, report)) == 'UNKNOWN: ' + str(report)
+    assert format_result('FC', (False, {'A'})) == 'NO'
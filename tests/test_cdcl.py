@@ -0,0 +1,25 @@
+from cdcl import CDCLSolver
+
+
+def test_random_decisions_without_variables():
+    solver = CDCLSolver(seed=1, random_freq=1.0)
+    assert solver.solve() is True
+    assert solver.model == {}
+
+
+def test_random_decisions_need_a_seed():
+    solver = CDCLSolver(random_freq=1.0)
+    solver.add_clause([1, 2])
+    solver.add_clause([-1, 2])
+    assert solver.solve() is True
+    assert solver.model[2]
+
+
+def test_random_decisions_stay_sound():
+    solver = CDCLSolver(seed=3, random_freq=0.5)
+    for lits in ([1, 2], [-1, 2], [1, -2], [-1, -2, 3], [-3, 1]):
+        solver.add_clause(lits)
+    assert solver.solve() is True
+    assert solver.model == {1: True, 2: True, 3: True}
+    solver.add_clause([-3])
+    assert solver.solve() is False
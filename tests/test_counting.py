@@ -0,0 +1,29 @@
+from counting import components, count_models, ModelCounter
+from decompose import split, decomposed_entails
+from KB_algo import CompiledKB
+from logic_expr import expr
+
+
+def test_components():
+    parts = components([(1, 2), (3,), (-2, 4), (5, -3)])
+    assert sorted(map(sorted, parts)) == [[(-2, 4), (1, 2)], [(3,), (5, -3)]]
+
+
+def test_empty_clause_has_no_models():
+    assert components([(1,), ()]) == [[(1,)], [()]]
+    assert count_models([(1, 2), ()], [1, 2]) == 0
+    assert ModelCounter().count_component([(1, 2), ()]) == 0
+
+
+def test_decompose_kb_with_empty_clause():
+    kb = CompiledKB([expr('A | B'), expr('C')])
+    kb.add_lits(())
+    relevant, others = split(kb, [kb.table.var(expr('A'))])
+    assert [part.clauses for part in others] == [[(3,)], [()]]
+    assert decomposed_entails(kb, expr('A'))[0] is True
+
+
+def test_count_models_matches_enumeration():
+    clauses = [(1, 2, -3), (-1, 3), (2, 4), (-4, -2, 5)]
+    expected = sum(all(any((m >> (abs(l) - 1)) & 1 == (l > 0) for l in c) for c in clauses) for m in range(32))
+    assert count_models(clauses, range(1, 6)) == expected
@@ -0,0 +1,77 @@
+import io
+import itertools
+import random
+from functools import partial
+
+import pytest
+
+from budget import Budget, BudgetExceeded, UNKNOWN, within_budget
+from cubes import conquer, cube_satisfiable, make_cubes
+from dimacs import read_dimacs
+
+
+def compiled(clauses, n=None):
+    n = n or max(abs(lit) for lits in clauses for lit in lits)
+    lines = ['p cnf {} {}'.format(n, len(clauses))] + [' '.join(map(str, lits + (0,))) for lits in clauses]
+    return read_dimacs(io.StringIO('\n'.join(lines)))
+
+
+def random_cnf(rng, n=8, m=20):
+    return [tuple(v if rng.random() < 0.5 else -v for v in rng.sample(range(1, n + 1), rng.randint(1, 3)))
+            for _ in range(m)]
+
+
+def holds(lits, model):
+    return [model[abs(lit)] == (lit > 0) for lit in lits]
+
+
+def models(kb):
+    n = len(kb.table)
+    for values in itertools.product((False, True), repeat=n):
+        model = (None,) + values
+        if all(any(holds(lits, model)) for lits in kb.clauses):
+            yield model
+
+
+@pytest.mark.parametrize('depth', [1, 2, 4])
+def test_cubes_are_disjoint_and_cover_every_model(depth):
+    rng = random.Random(depth)
+    for _ in range(40):
+        kb = compiled(random_cnf(rng), 8)
+        cubes = make_cubes(kb, (), depth)
+        for a, b in itertools.combinations(cubes, 2):
+            assert set(a) & {-lit for lit in b}
+        for model in models(kb):
+            assert sum(all(holds(cube, model)) for cube in cubes) == 1
+
+
+def test_failed_literal_is_forced():
+    kb = compiled([(-1, 2), (-1, -2), (1, 3), (3, 4), (-3, 4), (4, 5, 6)])
+    assert make_cubes(kb, (), 0) == [(-1,)]
+    assert all(-1 in cube for cube in make_cubes(kb, (), 2))
+
+
+def test_both_values_failing_leaves_no_cubes():
+    assert make_cubes(compiled([(1, 2), (1, -2), (-1, 2), (-1, -2), (3, 4)]), (), 3) == []
+
+
+def test_unknown_cube_without_a_model_runs_out():
+    rng = random.Random(5)
+    kb = compiled([tuple(v if rng.random() < 0.5 else -v for v in rng.sample(range(1, 21), 3))
+                   for _ in range(40)])
+    cubes = make_cubes(kb, (), 1)
+    for workers in (1, 2):
+        with pytest.raises(BudgetExceeded):
+            conquer(kb, (), cubes, 'dpll', workers, Budget(max_decisions=0))
+    for engine in ('dpll', 'cdcl'):
+        solve = partial(cube_satisfiable, depth=1, workers=1, engine=engine)
+        result, report = within_budget(Budget(max_decisions=0), solve, kb)
+        assert result is UNKNOWN and report['exceeded'] == 'max_decisions'
+
+
+def test_satisfiable_cube_wins_over_unknown():
+    kb = compiled([(1, 2), (3, 4), (-3, -4), (1, -5, 6), (-6, 5, -2)])
+    cubes = [(1,), (-1, 2, 3, -4, 5, 6)]
+    satisfiable, model, stats = conquer(kb, (), cubes, 'dpll', 1, Budget(max_decisions=0))
+    assert satisfiable and all(any(holds(lits, model)) for lits in kb.clauses)
+    assert [item['result'] for item in stats] == ['unknown', 'sat']
@@ -0,0 +1,72 @@
+import glob
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+from dimacs import read_dimacs
+from iengine import ask_dimacs, format_sat_result
+
+FILES = sorted(glob.glob(os.path.join(ROOT, 'tests', 'dimacs', '*.cnf')))
+METHODS = ['DPLL', 'DPLL:vsids', 'DPLL:dlis', 'DPLL:moms', 'DPLL:jw', 'CDCL', 'PORTFOLIO', 'CUBE', 'COUNT']
+
+
+def expected(path):
+    """The answer and model count recorded in the comments of a .cnf file."""
+    satisfiable, count = None, 0
+    with open(path) as f:
+        for line in f:
+            words = line.split()
+            if words[:1] != ['c']:
+                continue
+            if words[1:] in (['satisfiable'], ['unsatisfiable']):
+                satisfiable = words[1] == 'satisfiable'
+            elif words[1:2] == ['models']:
+                count = int(words[2])
+    assert satisfiable is not None and satisfiable == (count > 0), path
+    return satisfiable, count
+
+
+def satisfies(path, model):
+    with open(path) as f:
+        kb = read_dimacs(f)
+    symbols = kb.table.symbols
+    return all(any(model.get(symbols[abs(lit)]) == (lit > 0) for lit in lits) for lits in kb.clauses)
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('path', FILES, ids=os.path.basename)
+def test_recorded_answer(path, method):
+    satisfiable, count = expected(path)
+    answer, details = ask_dimacs(path, method)
+    assert answer == satisfiable
+    if method == 'COUNT':
+        assert details == count
+    elif satisfiable:
+        assert satisfies(path, details)
+
+
+@pytest.mark.parametrize('method', ['DPLL', 'CDCL'])
+@pytest.mark.parametrize('path', FILES, ids=os.path.basename)
+def test_recorded_answer_decomposed(path, method):
+    assert ask_dimacs(path, method, decompose=True)[0] == expected(path)[0]
+
+
+@pytest.mark.parametrize('path', FILES, ids=os.path.basename)
+def test_cli(path):
+    out = subprocess.run([sys.executable, os.path.join(ROOT, 'iengine.py'), path, 'COUNT'],
+                         capture_output=True, text=True, check=True).stdout.strip()
+    assert out == format_sat_result(expected(path))
+
+
+@pytest.mark.parametrize('text, count', [
+    ('p cnf 3 1\n1 2 0\n', 6),
+    ('p cnf 2 2\n1 -1 0\n2 0\n', 2),
+    ('p cnf 2 0\n', 4),
+])
+def test_count_includes_unused_variables(tmp_path, text, count):
+    path = tmp_path / 'f.cnf'
+    path.write_text(text)
+    assert ask_dimacs(str(path), 'COUNT') == (True, count)
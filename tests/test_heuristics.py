@@ -0,0 +1,103 @@
+import random
+from collections import Counter, defaultdict
+
+import pytest
+
+from KB_algo import CompiledKB, CompiledCNF, HeuristicTrail
+from heuristics import DLIS, MOMS, JeroslowWang, make_heuristic
+
+
+def random_sentence(rng, n=8, m=30):
+    kb = CompiledKB()
+    for _ in range(m):
+        vs = rng.sample(range(1, n + 1), rng.randint(1, 4))
+        kb.add_lits(tuple(v if rng.random() < 0.5 else -v for v in vs))
+    return CompiledCNF(kb)
+
+
+def open_clauses(sentence, model):
+    """The unassigned literals of each clause with no true literal, recounted from scratch."""
+    for lits in sentence.clauses:
+        if not any(model[abs(lit)] == (lit > 0) for lit in lits):
+            yield [lit for lit in lits if model[abs(lit)] is None]
+
+
+def check_counts(h, model):
+    clauses = list(open_clauses(h.sentence, model))
+    if isinstance(h, DLIS):
+        expected = Counter(lit for free in clauses for lit in free)
+        assert {lit: n for lit, n in h.counts.items() if n} == dict(expected)
+    elif isinstance(h, JeroslowWang):
+        expected = defaultdict(float)
+        for free in clauses:
+            for lit in free:
+                expected[lit] += 2.0 ** -len(free)
+        for lit in set(h.weights) | set(expected):
+            assert h.weights[lit] == pytest.approx(expected[lit])
+    elif isinstance(h, MOMS):
+        sizes = Counter(len(free) for free in clauses)
+        assert {s: n for s, n in h.clauses_of_size.items() if n} == dict(sizes)
+        for size in set(h.counts) | set(sizes):
+            expected = Counter(lit for free in clauses if len(free) == size for lit in free)
+            assert {lit: n for lit, n in h.counts[size].items() if n} == dict(expected)
+
+
+def random_walk(rng, sentence, h, steps=60):
+    """Assign and undo at random on a HeuristicTrail, yielding the model after each step."""
+    n = max(sentence.variables) + 1
+    trail = HeuristicTrail(n, h)
+    marks = []
+    for _ in range(steps):
+        free = [v for v in sentence.variables if trail.values[v] is None]
+        if free and (not marks or rng.random() < 0.6):
+            marks.append(trail.mark())
+            trail.assign(rng.choice(free), rng.random() < 0.5)
+        else:
+            k = rng.randrange(len(marks))
+            trail.undo(marks[k])
+            del marks[k:]
+        yield trail.values
+
+
+@pytest.mark.parametrize('name', ['dlis', 'moms', 'jw'])
+def test_incremental_counts_match_recount(name):
+    rng = random.Random(name)
+    for _ in range(20):
+        sentence = random_sentence(rng)
+        h = make_heuristic(name, sentence)
+        check_counts(h, [None] * (max(sentence.variables) + 1))
+        for model in random_walk(rng, sentence, h):
+            check_counts(h, model)
+
+
+@pytest.mark.parametrize('name', ['vsids', 'dlis', 'moms', 'jw'])
+def test_pick_unassigned_variable(name):
+    rng = random.Random(name)
+    for _ in range(20):
+        sentence = random_sentence(rng)
+        h = make_heuristic(name, sentence)
+        for model in random_walk(rng, sentence, h):
+            clauses = list(open_clauses(sentence, model))
+            if clauses and all(clauses):
+                v, value = h.pick(model)
+                assert v in sentence.variables and model[v] is None
+                assert value in (True, False)
+
+
+def test_vsids_conflict_bumps_falsified_clause():
+    kb = CompiledKB()
+    for lits in [(1, 2), (-1, 3), (-2, -3), (3, 4)]:
+        kb.add_lits(lits)
+    sentence = CompiledCNF(kb)
+    h = make_heuristic('vsids', sentence)
+    before = dict(h.activity)
+    model = [None, False, False, None, None]
+    h.conflict(model)
+    assert h.activity[1] > before[1] and h.activity[2] > before[2]
+    assert h.activity[3] == before[3] and h.activity[4] == before[4]
+    assert h.pick([None] * 5)[0] in (1, 2)
+
+
+def test_unknown_heuristic():
+    with pytest.raises(ValueError):
+        make_heuristic('nope', random_sentence(random.Random(0)))
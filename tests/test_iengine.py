@@ -0,0 +1,24 @@
+import glob
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_import_does_not_load_parallel_or_cache_modules():
+    code = ('import sys, iengine; print(" ".join(m for m in ("multiprocessing", "socket", "mmap", "hashlib", '
+            '"portfolio", "cubes", "counting", "decompose", "dimacs", "kb_cache") if m in sys.modules))')
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True,
+                            check=True).stdout.split()
+    assert loaded == []
+
+
+def test_materialized_fc_prints_the_same_answers():
+    for path in sorted(glob.glob(os.path.join(ROOT, 'tests', 'horn', '*.txt'))):
+        def run(*flags):
+            out = subprocess.run([sys.executable, 'iengine.py', path, 'FC', *flags], cwd=ROOT,
+                                 capture_output=True, text=True, check=True).stdout
+            answer, _, symbols = out.strip().partition(': ')
+            return answer, sorted(symbols.strip('{}').split(', '))
+        assert run('--materialize') == run(), path
@@ -0,0 +1,12 @@
+import instrumentation
+from KB_algo import PropKB
+from logic_expr import expr
+
+
+def test_stats_report_only_counters_the_engines_update():
+    kb = PropKB(expr('(A | B) & (~A | C) & (~B | C)'))
+    with instrumentation.collect_stats() as stats:
+        assert kb.ask_generator_tt(expr('C'))[0]
+    counters = stats.as_dict()['counters']
+    assert counters['models'] == 8
+    assert 'pl_true_calls' not in counters
@@ -0,0 +1,241 @@
+import random
+
+from KB_algo import (PropKB, PropDefiniteKB, IncrementalPropKB, CompiledKB, tt_entails, tt_entails_bitwise,
+                     pl_fc_entails, compile_bitwise, run_bitwise)
+from logic_expr import Expr, expr
+
+SYMBOLS = 'ABCDE'
+OPS = ['&', '|', '==>', '<=>']
+
+
+def random_sentence(rng, depth=2, symbols=SYMBOLS):
+    if depth == 0 or rng.random() < 0.3:
+        s = rng.choice(symbols)
+        return '~' + s if rng.random() < 0.3 else s
+    return '({} {} {})'.format(random_sentence(rng, depth - 1, symbols), rng.choice(OPS),
+                               random_sentence(rng, depth - 1, symbols))
+
+
+def test_tseitin_retract_matches_incremental_kb():
+    rng = random.Random(0)
+    for trial in range(40):
+        kb, reference = PropKB(cnf='tseitin'), IncrementalPropKB()
+        told = []
+        for step in range(12):
+            if told and rng.random() < 0.3:
+                s = told.pop(rng.randrange(len(told)))
+                kb.retract(s)
+                reference.retract(s)
+            else:
+                s = expr(random_sentence(rng))
+                told.append(s)
+                kb.tell(s)
+                reference.tell(s)
+            q = expr(random_sentence(rng, 1))
+            assert kb.ask_generator_dpll(q)[0] == reference.ask_generator_dpll(q)[0], (told, q)
+
+
+def test_tseitin_queries_do_not_grow_symbol_table():
+    kb = PropKB(expr('A & (B | C)'), cnf='tseitin')
+    size = len(kb.compiled.table)
+    q = expr('(A & B) | (C & D)')
+    for _ in range(50):
+        assert kb.ask_generator_dpll(q)[0] is False
+        assert kb.ask_generator_tt(q)[0] is False
+        assert kb.ask_generator_count(q)[0] is False
+    assert len(list(kb.models(q))) == 5
+    assert len(kb.compiled.table) == size
+
+
+def test_incremental_kb_solver_stays_bounded():
+    kb = IncrementalPropKB()
+    for s in ['A ==> B', 'B ==> C', 'C | D', '~D | E']:
+        kb.tell(expr(s))
+    sizes = []
+    for i in range(200):
+        assert kb.ask_generator_dpll(expr('(A ==> C) & (D ==> E)'))[0] is True
+        assert kb.ask_generator_dpll(expr('C & E'))[0] is False
+        sizes.append((len(kb.solver.clauses), kb.solver.num_vars))
+    assert max(sizes) < (100, 100)
+    kb.retract(expr('C | D'))
+    assert kb.ask_generator_dpll(expr('C | D'))[0] is False
+
+
+def test_bitwise_truth_table_matches_tt_entails():
+    rng = random.Random(1)
+    assert tt_entails_bitwise(Expr('&'), Expr('&')) == tt_entails(Expr('&'), Expr('&')) == (True, 1)
+    for trial in range(200):
+        symbols = 'ABCDEFGHI'[:rng.randint(1, 9)]
+        kb = expr(' & '.join(random_sentence(rng, 3, symbols) for _ in range(rng.randint(1, 4))))
+        q = expr(random_sentence(rng, 2, symbols))
+        assert tt_entails_bitwise(kb, q) == tt_entails(kb, q), (kb, q)
+        assert tt_entails_bitwise(kb, q, block_words=1) == tt_entails(kb, q), (kb, q)
+        flat = Expr(rng.choice('&|'), *(expr(random_sentence(rng, 2, symbols)) for _ in range(rng.randint(3, 6))))
+        assert tt_entails_bitwise(flat, q) == tt_entails(flat, q), (flat, q)
+
+
+def test_bitwise_registers_released_after_last_use():
+    import numpy as np
+    rng = random.Random(2)
+    symbols = [expr(s) for s in 'ABCDEF']
+    for trial in range(50):
+        exprs = [Expr('&', *(expr(random_sentence(rng, 2, 'ABCDEF')) for _ in range(5))), expr(random_sentence(rng))]
+        program, kept = compile_bitwise(exprs, symbols)
+        words = np.arange(4, dtype=np.uint64)
+        inputs = [np.full_like(words, rng.getrandbits(64)) for _ in symbols]
+        everything = run_bitwise(program, list(inputs), words)
+        released = run_bitwise(program, list(inputs), words, kept)
+        for i in kept:
+            assert (released[i] == everything[i]).all()
+        used = {a for op, args in program if op != 'const' for a in args}
+        assert all(released[i] is None for i in used - set(kept))
+
+
+def definite_kb(*sentences):
+    kb = PropDefiniteKB()
+    for s in sentences:
+        kb.tell(expr(s))
+    return kb
+
+
+def check_proof_tree(kb, tree):
+    symbol, subtrees = tree
+    rule = kb.proofs[symbol]
+    assert tuple(t[0] for t in subtrees) == kb.premises.get(rule, ())
+    for t in subtrees:
+        check_proof_tree(kb, t)
+
+
+def test_bc_tell_makes_failed_goal_provable():
+    kb = definite_kb('A', '(A & B) ==> C')
+    assert kb.ask_generator_bc(expr('C'))[0] is False
+    assert expr('C') in kb.failures
+    kb.tell(expr('B'))
+    assert expr('C') not in kb.failures
+    assert kb.ask_generator_bc(expr('C')) == (True, {expr('A'), expr('B'), expr('C')})
+    kb.tell(expr('D ==> E'))
+    assert kb.ask_generator_bc(expr('E'))[0] is False
+    kb.tell(expr('C ==> D'))
+    assert kb.ask_generator_bc(expr('E'))[0] is True
+
+
+def test_bc_retract_fact_used_by_cached_proof():
+    kb = definite_kb('A', 'A ==> B', 'B ==> C', 'D', 'D ==> E')
+    assert kb.ask_generator_bc(expr('C'))[0] is True
+    assert kb.ask_generator_bc(expr('E'))[0] is True
+    kb.retract(expr('A'))
+    assert expr('B') not in kb.proofs and expr('C') not in kb.proofs
+    assert expr('E') in kb.proofs
+    assert kb.ask_generator_bc(expr('C'))[0] is False
+    kb.tell(expr('D ==> A'))
+    assert kb.ask_generator_bc(expr('C'))[0] is True
+
+
+def test_bc_cyclic_rules():
+    kb = definite_kb('A ==> B', 'B ==> A', '(A & C) ==> D')
+    assert kb.ask_generator_bc(expr('A'))[0] is False
+    assert kb.ask_generator_bc(expr('D'))[0] is False
+    kb.tell(expr('C ==> A'))
+    assert kb.ask_generator_bc(expr('B'))[0] is False
+    kb.tell(expr('C'))
+    assert kb.ask_generator_bc(expr('B'))[0] is True
+    assert kb.ask_generator_bc(expr('D'))[0] is True
+    kb.retract(expr('C'))
+    assert kb.ask_generator_bc(expr('A'))[0] is False
+
+
+def test_bc_proof_tree_follows_rules_used():
+    kb = definite_kb('A', 'B', '(A & B) ==> C', 'C ==> D', '(A & D) ==> E', 'B ==> E')
+    entailed, tree = kb.ask_generator_bc(expr('E'), proof=True)
+    assert entailed and tree[0] == expr('E')
+    check_proof_tree(kb, tree)
+
+
+def test_bc_proof_table_matches_fresh_kb():
+    rng = random.Random(2)
+    symbols = 'ABCDEFG'
+    for trial in range(30):
+        kb, told = PropDefiniteKB(), []
+        for step in range(25):
+            if told and rng.random() < 0.35:
+                s = told.pop(rng.randrange(len(told)))
+                kb.retract(s)
+            else:
+                head = rng.choice(symbols)
+                body = rng.sample(symbols, rng.randint(0, 2))
+                s = expr(' & '.join(body) + ' ==> ' + head if body else head)
+                told.append(s)
+                kb.tell(s)
+            q = expr(rng.choice(symbols))
+            fresh = definite_kb(*map(str, told)) if told else PropDefiniteKB()
+            assert kb.ask_generator_bc(q)[0] == pl_fc_entails(fresh, q)[0], (told, q)
+            if kb.ask_generator_bc(q)[0]:
+                check_proof_tree(kb, kb.proof_tree(q))
+
+
+def random_definite_clause(rng, symbols='ABCD'):
+    premises = rng.sample(symbols, rng.randint(0, 2))
+    head = rng.choice(symbols)
+    return expr(head if not premises else '{} ==> {}'.format(' & '.join(premises + premises[:1]), head))
+
+
+def horn_indexes(kb):
+    """The Horn clause indexes of kb, with empty entries dropped and orders ignored."""
+    return (set(kb.facts), kb.premises, kb.premise_count,
+            {p: set(cs) for p, cs in kb.premise_index.items() if cs},
+            {h: set(cs) for h, cs in kb.conclusion_index.items() if cs},
+            dict(kb.multiplicity))
+
+
+def test_horn_indexes_match_fresh_kb_after_tell_and_retract():
+    rng = random.Random(3)
+    for trial in range(100):
+        kb, told = PropDefiniteKB(), []
+        for step in range(15):
+            if told and rng.random() < 0.4:
+                s = told.pop(rng.randrange(len(told)))
+                kb.retract(s)
+            else:
+                s = rng.choice(told) if told and rng.random() < 0.3 else random_definite_clause(rng)
+                told.append(s)
+                kb.tell(s)
+            assert horn_indexes(kb) == horn_indexes(definite_kb(*told)), told
+
+
+def test_compiled_clauses_match_fresh_encoding_after_tell_and_retract():
+    rng = random.Random(4)
+    for cnf in ('distribute', 'tseitin'):
+        for trial in range(60):
+            kb, told = PropKB(cnf=cnf), []
+            for step in range(10):
+                if told and rng.random() < 0.4:
+                    s = told.pop(rng.randrange(len(told)))
+                    kb.retract(s)
+                else:
+                    s = rng.choice(told) if told and rng.random() < 0.3 else expr(random_sentence(rng))
+                    told.append(s)
+                    kb.tell(s)
+                compiled = kb.compiled
+                fresh = CompiledKB()
+                fresh.table = compiled.table
+                for c in kb.clauses:
+                    fresh.add(c)
+                assert sorted(compiled.clauses) == sorted(fresh.clauses), told
+                assert dict(compiled.occurrences) == dict(fresh.occurrences), told
+                model = [None] + [rng.random() < 0.5 for _ in compiled.table.symbols[1:]]
+                evaluated = lambda kb: sorted(zip(kb.clauses, (e(model) for e in kb.evaluators)))
+                assert evaluated(compiled) == evaluated(fresh)
+
+
+def test_materialized_fc_reports_the_same_symbols():
+    rng = random.Random(5)
+    for trial in range(60):
+        kb, told = PropDefiniteKB(materialize=True), []
+        for step in range(12):
+            if told and rng.random() < 0.3:
+                kb.retract(told.pop(rng.randrange(len(told))))
+            else:
+                told.append(random_definite_clause(rng))
+                kb.tell(told[-1])
+            for q in map(expr, 'ABCD'):
+                assert kb.ask_generator_fc(q) == pl_fc_entails(definite_kb(*told), q), (told, q)
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import kb_cache
+from conftest import ROOT
+from iengine import load_input_file, new_kb
+
+
+def run_iengine(*args, cwd=None):
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'iengine.py')] + list(args), cwd=cwd,
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_tseitin_kb_from_cache_in_new_process(tmp_path):
+    path = tmp_path / 'kb.txt'
+    path.write_text('TELL\n(a & b) || c; ~c;\nASK\nx || y\n')
+    cache = str(tmp_path / 'cache')
+    first = run_iengine(str(path), 'DPLL', '--cnf', 'tseitin', '--cache-dir', cache)
+    assert first.startswith('NO')
+    assert os.listdir(cache)
+    assert run_iengine(str(path), 'DPLL', '--cnf', 'tseitin', '--cache-dir', cache) == first
+
+
+def test_no_cache_unless_asked(tmp_path):
+    path = tmp_path / 'kb.txt'
+    path.write_text('TELL\na => b; a;\nASK\nb\n')
+    assert run_iengine(str(path), 'FC', cwd=str(tmp_path)).startswith('YES')
+    assert os.listdir(tmp_path) == ['kb.txt']
+
+
+def test_key_depends_on_code_version(monkeypatch):
+    key = kb_cache.cache_key(b'TELL\na;\nASK\na\n', new_kb('FC').__class__, 'distribute')
+    assert kb_cache.code_version().startswith(kb_cache.MAGIC.decode())
+    monkeypatch.setattr(kb_cache, 'code_version', lambda: 'KBC1-changed')
+    assert kb_cache.cache_key(b'TELL\na;\nASK\na\n', new_kb('FC').__class__, 'distribute') != key
+
+
+def write_kb(tmp_path, text='TELL\na => b; a;\nASK\nb\n'):
+    path = tmp_path / 'kb.txt'
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize('damage', [lambda data: b'', lambda data: data[:len(data) // 2],
+                                    lambda data: data[:30], lambda data: b'XXXX' + data[4:]])
+def test_damaged_cache_file_is_a_miss(tmp_path, damage):
+    filename, cache = write_kb(tmp_path), str(tmp_path / 'cache')
+    kb, query = load_input_file(filename, 'FC', cache_dir=cache)
+    [name] = os.listdir(cache)
+    path = os.path.join(cache, name)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    assert kb_cache.load_kb(path, new_kb('FC')) is None
+    assert not os.path.exists(path)
+    kb, query = load_input_file(filename, 'FC', cache_dir=cache)
+    assert kb.ask_generator_fc(query)[0]
+    assert os.path.exists(path)
+
+
+def test_prune_drops_least_recently_used(tmp_path):
+    cache = str(tmp_path / 'cache')
+    paths = []
+    for i in range(3):
+        kb, query = load_input_file(write_kb(tmp_path, 'TELL\na{0} => b; a{0};\nASK\nb\n'.format(i)), 'FC',
+                                    cache_dir=cache)
+        paths.append(os.path.join(cache, kb_cache.cache_key(
+            (tmp_path / 'kb.txt').read_bytes(), type(kb), 'distribute') + '.kbc'))
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age, 1000 - age))
+    size = os.path.getsize(paths[0])
+    kb_cache.prune(cache, 2 * size)
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
@@ -0,0 +1,34 @@
+import re
+
+import pytest
+
+from kb_parser import parse
+from logic_expr import expr
+
+
+def baseline_parse(text):
+    """The eval-based reader that kb_parser replaced."""
+    return expr(re.sub(r'(?<!<)=>', '==>', text.upper().replace('||', '|')))
+
+
+@pytest.mark.parametrize('text, grouping', [
+    ('a & b => c', '(a & b) => c'),
+    ('a || b => c', '(a || b) => c'),
+    ('a => b & c', 'a => (b & c)'),
+    ('~a || b & c', '~a || (b & c)'),
+    ('a => b <=> c', '(a => b) <=> c'),
+    ('a <=> b <=> c', '(a <=> b) <=> c'),
+])
+def test_same_grouping_as_baseline(text, grouping):
+    assert parse(text) == parse(grouping) == baseline_parse(text)
+
+
+@pytest.mark.parametrize('text, grouping, baseline_grouping', [
+    ('a => b || c', 'a => (b || c)', '(a => b) || c'),
+    ('a => b => c', 'a => (b => c)', '(a => b) => c'),
+    ('a <=> b => c', 'a <=> (b => c)', '(a <=> b) => c'),
+])
+def test_grouping_changed_from_baseline(text, grouping, baseline_grouping):
+    assert parse(text) == parse(grouping)
+    assert baseline_parse(text) == parse(baseline_grouping)
+    assert parse(text) != baseline_parse(text)
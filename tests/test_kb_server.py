@@ -0,0 +1,22 @@
+import threading
+
+from kb_server import KBStore, make_server, request
+
+
+def test_materialized_session(tmp_path):
+    store = KBStore(materialize=True)
+    address = str(tmp_path / 'kb.sock')
+    with make_server(address, store, workers=1) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            responses = request(address, ['TELL h a', 'TELL h a => b', 'TELL h b & c => d', 'TELL h c',
+                                          'ASK h FC d', 'RETRACT h c', 'ASK h FC d', 'ASK h FC b'])
+        finally:
+            server.shutdown()
+    assert responses[:4] == ['OK'] * 4
+    assert responses[4].startswith('YES')
+    assert responses[5:7] == ['OK', 'NO']
+    assert responses[7].startswith('YES')
+    kb = store.get('h').kb('FC')
+    assert kb.materialize and kb.closure is not None
@@ -0,0 +1,21 @@
+import gc
+import pickle
+
+import logic_expr
+from logic_expr import expr, intern_expr
+
+
+def test_interned_exprs_are_shared():
+    a = intern_expr(expr('(P & Q) | ~R'))
+    assert a is intern_expr(expr('(P & Q) | ~R'))
+    assert pickle.loads(pickle.dumps(a)) is a
+
+
+def test_intern_table_releases_unused_exprs():
+    gc.collect()
+    size = len(logic_expr._intern_table)
+    kept = [intern_expr(expr('Unused{0} | (Other{0} & Unused{0})'.format(i))) for i in range(100)]
+    assert len(logic_expr._intern_table) >= size + 300
+    del kept
+    gc.collect()
+    assert len(logic_expr._intern_table) <= size
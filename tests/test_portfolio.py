@@ -0,0 +1,103 @@
+import io
+import multiprocessing
+import queue
+import random
+import time
+from functools import partial
+
+from budget import Budget, UNKNOWN, within_budget
+from cdcl import CDCLSolver
+from dimacs import read_dimacs
+from portfolio import ClauseExchange, portfolio_entails, run_portfolio, solve_config
+
+CDCL_PAIR = [{'engine': 'cdcl'}, {'engine': 'cdcl', 'seed': 1, 'polarity': True}]
+
+
+def pigeonhole(pigeons, holes):
+    """The unsatisfiable CNF clauses saying pigeons fit in fewer holes, one per hole."""
+    var = lambda i, j: i * holes + j + 1
+    clauses = [tuple(var(i, j) for j in range(holes)) for i in range(pigeons)]
+    for j in range(holes):
+        for i in range(pigeons):
+            for k in range(i + 1, pigeons):
+                clauses.append((-var(i, j), -var(k, j)))
+    return clauses
+
+
+def compiled(clauses):
+    n = max(abs(lit) for lits in clauses for lit in lits)
+    lines = ['p cnf {} {}'.format(n, len(clauses))] + [' '.join(map(str, lits + (0,))) for lits in clauses]
+    return read_dimacs(io.StringIO('\n'.join(lines)))
+
+
+def random_3sat(rng, n=20, m=60):
+    return [tuple(v if rng.random() < 0.5 else -v for v in rng.sample(range(1, n + 1), 3))
+            for _ in range(m)]
+
+
+def unsatisfiable(clauses):
+    solver = CDCLSolver()
+    return not all(solver.add_clause(lits) for lits in clauses) or not solver.solve()
+
+
+def test_exchange_sends_short_clauses_to_the_others():
+    inbox, a, b = queue.Queue(), queue.Queue(), queue.Queue()
+    exchange = ClauseExchange(inbox, [a, b], max_length=2)
+    exchange.export([1, -2])
+    exchange.export([1, 2, 3])
+    assert a.get_nowait() == b.get_nowait() == (1, -2)
+    assert a.empty() and b.empty()
+    inbox.put((4,))
+    inbox.put((-4, 5))
+    assert exchange.collect() == [(4,), (-4, 5)]
+    assert exchange.collect() == []
+
+
+def test_shared_clauses_are_entailed_and_imported():
+    clauses = pigeonhole(5, 4)
+    shared = queue.Queue()
+    sender = ClauseExchange(queue.Queue(), [shared], max_length=3)
+    assert solve_config({'engine': 'cdcl', 'restart_base': 2}, compiled(clauses), (), None, sender)[0] is False
+    learnt = ClauseExchange(shared, [], 3).collect()
+    assert learnt and all(len(lits) <= 3 for lits in learnt)
+    for lits in learnt:
+        assert unsatisfiable(clauses + [(-lit,) for lit in lits])
+    inbox = queue.Queue()
+    for lits in learnt:
+        inbox.put(lits)
+    receiver = ClauseExchange(inbox, [], 3)
+    assert solve_config({'engine': 'cdcl', 'restart_base': 1}, compiled(clauses), (), None, receiver)[0] is False
+    assert inbox.empty()
+
+
+def test_sharing_portfolio_answers():
+    rng = random.Random(3)
+    for clauses in [pigeonhole(5, 4)] + [random_3sat(rng) for _ in range(4)]:
+        kb = compiled(clauses)
+        satisfiable, model, winner = run_portfolio(kb, (), None, CDCL_PAIR, share=True)
+        assert satisfiable == (not unsatisfiable(kb.clauses))
+        if satisfiable:
+            assert all(any(model.get(abs(lit)) == (lit > 0) for lit in lits) for lits in kb.clauses)
+        assert winner in (0, 1)
+    assert not multiprocessing.active_children()
+
+
+def test_budget_gives_unknown_and_stops_workers():
+    kb = compiled(pigeonhole(9, 8))
+    entails = partial(portfolio_entails, configs=CDCL_PAIR, share=True)
+    result, report = within_budget(Budget(max_decisions=5), entails, kb, 'Q', 'distribute')
+    assert result is UNKNOWN and 'exceeded' in report
+    assert not multiprocessing.active_children()
+    start = time.monotonic()
+    result, report = within_budget(Budget(timeout=0.5), entails, kb, 'Q', 'distribute')
+    assert result is UNKNOWN and time.monotonic() - start < 5
+    assert not multiprocessing.active_children()
+
+
+def test_same_seed_same_result():
+    rng = random.Random(7)
+    for _ in range(5):
+        kb = compiled(random_3sat(rng))
+        for config in [{'engine': 'cdcl', 'seed': 4, 'random_freq': 0.1},
+                       {'engine': 'dpll', 'seed': 4}]:
+            assert solve_config(config, kb) == solve_config(config, kb)